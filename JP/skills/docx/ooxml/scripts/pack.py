@@ -7,14 +7,61 @@ XMLの整形（pretty print）を戻した上で、ディレクトリを.docx/.p
 """
 
 import argparse
+import atexit
+import hashlib
+import os
+import re
 import shutil
+import socket
+import sqlite3
 import subprocess
 import sys
 import tempfile
-import defusedxml.minidom
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import lxml.etree
+
+# 信頼できない入力を想定し、外部エンティティやネットワークアクセスは無効化する
+_PARSER_OPTIONS = dict(
+    remove_comments=True, resolve_entities=False, no_network=True, huge_tree=True
+)
+# パーサはスレッドごとに作る（lxmlは同じパーサを使うパースを直列化するため）
+_thread_parsers = threading.local()
+
+# タグ間の空白（XML宣言直後の改行は除く）またはコメント。どちらも無ければ圧縮済み
+_CONDENSABLE = re.compile(rb"(?<!\?)>\s+<|<!--")
+
+# XMLは低めの圧縮レベルでも圧縮率がほとんど変わらないため、CPU時間を優先する
+_COMPRESS_LEVEL = 3
+# Linuxのioctl FICLONE（Btrfs/XFS等でのreflinkコピー）
+_FICLONE = 0x40049409
+# 既に圧縮済みのメディアは再圧縮しても縮まないため無圧縮で格納する
+_STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".mp4", ".mp3", ".m4a", ".wdp")
+# zipエントリの更新日時と属性は固定し、同じ内容からは同じバイト列を作る
+# （更新日時が入ると検証キャッシュのハッシュが毎回変わってしまうため）
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_ZIP_EXTERNAL_ATTR = 0o100644 << 16
+
+# 常駐させるsofficeリスナーの接続先（起動コストを複数回の検証で使い回す）
+# ポートは起動時に空いているものを選ぶ
+_SOFFICE_UNO_URL = "socket,host=127.0.0.1,port={port};urp;"
+# 変換1回あたりの上限時間（秒）。subprocessでの変換と同じ
+_SOFFICE_TIMEOUT = 10
+_soffice_desktop = None
+_soffice_proc = None
+# 常駐sofficeの起動に失敗したら、以降はsubprocess変換だけを使う
+_soffice_unavailable = False
+
+# 検証に合格したファイル内容のハッシュを記録するキャッシュ（同一内容の再検証を省略）
+_VALIDATION_CACHE = Path.home() / ".cache" / "ooxml-pack" / "validated.db"
+_VALIDATION_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # 秒
+# 1にするとキャッシュを使わず毎回sofficeで検証する
+_NO_CACHE_ENV = "OOXML_PACK_NO_CACHE"
+
 
 def main():
     parser = argparse.ArgumentParser(description="ディレクトリをOfficeファイルにパックします")
@@ -64,19 +111,24 @@ def pack_document(input_dir, output_file, validate=False):
     # 元ディレクトリを変更しないよう一時ディレクトリで作業
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_content_dir = Path(temp_dir) / "content"
-        shutil.copytree(input_dir, temp_content_dir)
+        shutil.copytree(input_dir, temp_content_dir, copy_function=_cheap_copy)
+
+        # ディレクトリを1回だけ走査し、zip対象の全ファイルと圧縮対象のXMLを同時に分類
+        files = _list_files(temp_content_dir)
+        xml_files = [path for path, _ in files if path.endswith((".xml", ".rels"))]
 
         # pretty printで入った不要な空白を除去するためXMLを処理
-        for pattern in ["*.xml", "*.rels"]:
-            for xml_file in temp_content_dir.rglob(pattern):
-                condense_xml(xml_file)
+        # （ファイルごとに独立しているためスレッドで並列化。パーサはスレッドごとに持つ）
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(condense_xml, xml_files))
 
         # 最終的なOfficeファイルをzipアーカイブとして作成
         output_file.parent.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zf:
-            for f in temp_content_dir.rglob("*"):
-                if f.is_file():
-                    zf.write(f, f.relative_to(temp_content_dir))
+        with zipfile.ZipFile(
+            output_file, "w", zipfile.ZIP_DEFLATED, compresslevel=_COMPRESS_LEVEL
+        ) as zf:
+            for path, arcname in files:
+                _write_entry(zf, path, arcname)
 
         # 必要なら検証
         if validate:
@@ -87,8 +139,151 @@ def pack_document(input_dir, output_file, validate=False):
     return True
 
 
+def _write_entry(zf, path, arcname):
+    """1ファイルをzipに追加します。
+
+    ZipFile.writeは8KiB単位でPythonのループを回して圧縮するため、deflate対象は
+    ファイル全体を読み込んでからwritestrで渡し、zlibの呼び出しを1回にまとめます。
+    無圧縮で格納するメディアは大きくなり得るので、従来どおりストリームで書き込みます。
+    更新日時はファイルのmtimeではなく固定値を使います。
+    """
+    zinfo = zipfile.ZipInfo(arcname, date_time=_ZIP_DATE_TIME)
+    zinfo.external_attr = _ZIP_EXTERNAL_ATTR
+
+    if arcname.lower().endswith(_STORED_SUFFIXES):
+        zinfo.compress_type = zipfile.ZIP_STORED
+        zinfo.file_size = os.path.getsize(path)
+        with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return
+
+    with open(path, "rb") as f:
+        data = f.read()
+    zf.writestr(
+        zinfo,
+        data,
+        compress_type=zipfile.ZIP_DEFLATED,
+        compresslevel=_COMPRESS_LEVEL,
+    )
+
+
+def _list_files(root_dir):
+    """root_dir以下のファイルを (パス, zip内の名前) のリストで返します。
+
+    os.scandirで各ディレクトリを1回だけ読み、DirEntryのキャッシュ済み種別を使うため
+    ファイルごとのstatは発生しません。各ディレクトリ内ではファイル→サブディレクトリの
+    順に名前順で並べ、出力zipのエントリ順を再現可能にします。
+    """
+    files = []
+    stack = [(os.fspath(root_dir), "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, f"{prefix}{entry.name}/"))
+            else:
+                files.append((entry.path, f"{prefix}{entry.name}"))
+        stack.extend(reversed(subdirs))
+    return files
+
+
+def _cheap_copy(src, dst):
+    """copytree用のコピー関数。書き換えないファイルはバイトコピーを避けます。
+
+    XML/relsはcondense_xmlでその場書き換えするため実体をコピーします。
+    それ以外（メディア等）はzipに読み込むだけなので、reflink → ハードリンク →
+    通常コピーの順に試します。
+    """
+    if not src.endswith((".xml", ".rels")):
+        if _reflink(src, dst):
+            return dst
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst)
+
+
+def _reflink(src, dst):
+    """対応ファイルシステムでreflink（copy-on-write）コピーを試みます。"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
 def validate_document(doc_path):
-    """sofficeでHTML変換してドキュメントを検証します。"""
+    """sofficeでHTML変換してドキュメントを検証します。
+
+    同じ内容のファイルが以前に合格していれば、sofficeを起動せずに合格とします
+    （pack_documentはエントリの更新日時を固定するため、同じ内容なら同じハッシュになる）。
+    """
+    digest = None
+    if os.environ.get(_NO_CACHE_ENV) != "1":
+        digest = hashlib.blake2b(doc_path.read_bytes(), digest_size=16).hexdigest()
+        if _is_cached_valid(digest):
+            return True
+
+    valid = _validate_with_soffice(doc_path)
+    # sofficeが無く検証自体をスキップした場合は記録しない
+    if valid and digest is not None and shutil.which("soffice"):
+        _cache_valid(digest)
+    return valid
+
+
+def _is_cached_valid(digest):
+    """ハッシュが検証キャッシュに記録済みか確認します（キャッシュの不具合は無視）。"""
+    if not _VALIDATION_CACHE.exists():
+        return False
+    try:
+        with sqlite3.connect(_VALIDATION_CACHE) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM validated WHERE hash = ? AND ts >= ?",
+                (digest, int(time.time()) - _VALIDATION_CACHE_MAX_AGE),
+            ).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+def _cache_valid(digest):
+    """合格したハッシュを記録し、期限切れのエントリを削除します。"""
+    try:
+        _VALIDATION_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        now = int(time.time())
+        with sqlite3.connect(_VALIDATION_CACHE) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS validated (hash TEXT PRIMARY KEY, ts INT)"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO validated (hash, ts) VALUES (?, ?)",
+                (digest, now),
+            )
+            conn.execute(
+                "DELETE FROM validated WHERE ts < ?",
+                (now - _VALIDATION_CACHE_MAX_AGE,),
+            )
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def _validate_with_soffice(doc_path):
+    """sofficeでHTML変換できるか確認します。"""
     # 拡張子に応じて適切な変換フィルタを選択
     match doc_path.suffix.lower():
         case ".docx":
@@ -99,6 +294,25 @@ def validate_document(doc_path):
             filter_name = "html:HTML (StarCalc)"
 
     with tempfile.TemporaryDirectory() as temp_dir:
+        # 常駐sofficeが使えれば、毎回の起動（数秒）を省いてUNO経由で変換
+        desktop = _get_soffice_desktop()
+        if desktop is not None:
+            try:
+                _convert_with_desktop(desktop, doc_path, filter_name, temp_dir)
+            except TimeoutError:
+                _stop_soffice()
+                print("検証エラー: 変換がタイムアウトしました", file=sys.stderr)
+                return False
+            except Exception:
+                # ブリッジの切断など常駐側の異常かもしれないため、常駐sofficeを捨てて
+                # 下のsubprocess変換で判定し直す
+                _stop_soffice()
+            else:
+                if not (Path(temp_dir) / f"{doc_path.stem}.html").exists():
+                    print("検証エラー: Document validation failed", file=sys.stderr)
+                    return False
+                return True
+
         try:
             result = subprocess.run(
                 [
@@ -111,7 +325,7 @@ def validate_document(doc_path):
                     str(doc_path),
                 ],
                 capture_output=True,
-                timeout=10,
+                timeout=_SOFFICE_TIMEOUT,
                 text=True,
             )
             if not (Path(temp_dir) / f"{doc_path.stem}.html").exists():
@@ -130,29 +344,184 @@ def validate_document(doc_path):
             return False
 
 
+def _get_soffice_desktop(timeout=10):
+    """常駐sofficeリスナーを起動（初回のみ）し、UNOのDesktopを返します。
+
+    Python UNOブリッジ（uno）が無い、またはリスナーに接続できない場合は
+    Noneを返し、呼び出し側は従来のsubprocess変換にフォールバックします。
+    起動に失敗した場合はそれを記録し、以降の呼び出しでは起動を試みません。
+    """
+    global _soffice_desktop, _soffice_proc, _soffice_unavailable
+    if _soffice_desktop is not None:
+        return _soffice_desktop
+    if _soffice_unavailable:
+        return None
+
+    try:
+        import uno
+    except ImportError:
+        _soffice_unavailable = True
+        return None
+
+    uno_url = _SOFFICE_UNO_URL.format(port=_free_port())
+    try:
+        proc = subprocess.Popen(
+            [
+                "soffice",
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nofirststartwizard",
+                f"--accept={uno_url}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        _soffice_unavailable = True
+        return None
+    if _soffice_proc is None:
+        atexit.register(_stop_soffice)
+    _soffice_proc = proc
+
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            context = resolver.resolve(f"uno:{uno_url}StarOffice.ComponentContext")
+            break
+        except Exception:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                _stop_soffice()
+                _soffice_unavailable = True
+                return None
+            time.sleep(0.1)
+
+    _soffice_desktop = context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.frame.Desktop", context
+    )
+    return _soffice_desktop
+
+
+def _free_port():
+    """ローカルで現在空いているTCPポート番号を返します。"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _stop_soffice():
+    """常駐sofficeを終了し、次回の検証で起動し直せるようにします。"""
+    global _soffice_desktop, _soffice_proc
+    _soffice_desktop = None
+    if _soffice_proc is not None and _soffice_proc.poll() is None:
+        _soffice_proc.terminate()
+
+
+def _convert_with_desktop(desktop, doc_path, filter_name, out_dir):
+    """常駐sofficeでドキュメントを開き、HTMLとしてout_dirに書き出します。
+
+    UNO呼び出しは別スレッドで行い、_SOFFICE_TIMEOUT秒を超えたらTimeoutErrorを送出します
+    （呼び出し側で常駐sofficeを終了させると、残ったスレッドの呼び出しも終わる）。
+    """
+    errors = []
+
+    def convert():
+        try:
+            _store_as_html(desktop, doc_path, filter_name, out_dir)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=convert, daemon=True)
+    thread.start()
+    thread.join(_SOFFICE_TIMEOUT)
+    if thread.is_alive():
+        raise TimeoutError("soffice conversion timed out")
+    if errors:
+        raise errors[0]
+
+
+def _store_as_html(desktop, doc_path, filter_name, out_dir):
+    """UNOのDesktopでドキュメントを開き、HTMLとしてout_dirに書き出します。"""
+    import uno
+    from com.sun.star.beans import PropertyValue
+
+    # "--convert-to" 形式の "html:HTML" から、フィルタ名部分だけを取り出す
+    export_filter = filter_name.split(":", 1)[1]
+    source_url = uno.systemPathToFileUrl(str(Path(doc_path).resolve()))
+    target_url = uno.systemPathToFileUrl(
+        str(Path(out_dir).resolve() / f"{doc_path.stem}.html")
+    )
+
+    document = desktop.loadComponentFromURL(
+        source_url, "_blank", 0, (PropertyValue(Name="Hidden", Value=True),)
+    )
+    if document is None:
+        return
+    try:
+        document.storeToURL(
+            target_url, (PropertyValue(Name="FilterName", Value=export_filter),)
+        )
+    finally:
+        document.close(True)
+
+
+def _get_parsers():
+    """現在のスレッド用の (空白除去パーサ, 空白保持パーサ) を返します。"""
+    parsers = getattr(_thread_parsers, "parsers", None)
+    if parsers is None:
+        parsers = (
+            # w:t等を含まないファイル用: パース時点で空白テキストを捨てる
+            lxml.etree.XMLParser(remove_blank_text=True, **_PARSER_OPTIONS),
+            # w:t等を含むファイル用: 空白はすべて残し、後で選択的に除去する
+            lxml.etree.XMLParser(**_PARSER_OPTIONS),
+        )
+        _thread_parsers.parsers = parsers
+    return parsers
+
+
 def condense_xml(xml_file):
     """不要な空白を除去し、コメントノードを削除します。"""
-    with open(xml_file, "r", encoding="utf-8") as f:
-        dom = defusedxml.minidom.parse(f)
-
-    # 要素ごとに空白テキストノードとコメントノードを除去
-    for element in dom.getElementsByTagName("*"):
-        # w:t要素はスキップ（内容文字列を壊さないため）
-        if element.tagName.endswith(":t"):
-            continue
-
-        # 空白のみのテキストノードとコメントノードを削除
-        for child in list(element.childNodes):
-            if (
-                child.nodeType == child.TEXT_NODE
-                and child.nodeValue
-                and child.nodeValue.strip() == ""
-            ) or child.nodeType == child.COMMENT_NODE:
-                element.removeChild(child)
+    with open(xml_file, "rb") as f:
+        data = f.read()
+
+    # 整形されていない（既に圧縮済みの）ファイルはパース/書き戻しを省略
+    if not _CONDENSABLE.search(data):
+        return
+
+    blank_text_parser, preserving_parser = _get_parsers()
+    if b":t>" in data or b":t " in data:
+        # w:t要素などの内容文字列を壊さないよう、それ以外の要素の空白だけを除去
+        # （要素ごとに1回だけ走査し、直下の空白テキスト＝textと子のtailをまとめて処理）
+        # 空白判定はstrip()のような文字列コピーを作らないstr.isspace()で行う
+        root = lxml.etree.fromstring(data, preserving_parser)
+        for element in root.iter(lxml.etree.Element):
+            if element.tag.endswith("}t"):
+                continue
+            if element.text and element.text.isspace():
+                element.text = None
+            for child in element:
+                if child.tail and child.tail.isspace():
+                    child.tail = None
+    else:
+        root = lxml.etree.fromstring(data, blank_text_parser)
 
     # 圧縮したXMLを書き戻す
+    tree = root.getroottree()
     with open(xml_file, "wb") as f:
-        f.write(dom.toxml(encoding="UTF-8"))
+        f.write(
+            lxml.etree.tostring(
+                tree,
+                xml_declaration=True,
+                encoding="UTF-8",
+                standalone=tree.docinfo.standalone,
+            )
+        )
 
 
 if __name__ == "__main__":
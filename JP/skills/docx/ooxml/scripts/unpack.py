@@ -2,28 +2,90 @@
 """Officeファイル（.docx/.pptx/.xlsx）をアンパックし、XML内容を整形します。"""
 
 import random
+import re
 import sys
-import defusedxml.minidom
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# コマンドライン引数を取得
-assert len(sys.argv) == 3, "Usage: python unpack.py <office_file> <output_dir>"
-input_file, output_dir = sys.argv[1], sys.argv[2]
-
-# 展開して整形
-output_path = Path(output_dir)
-output_path.mkdir(parents=True, exist_ok=True)
-zipfile.ZipFile(input_file).extractall(output_path)
-
-# すべてのXMLファイルを整形（pretty print）
-xml_files = list(output_path.rglob("*.xml")) + list(output_path.rglob("*.rels"))
-for xml_file in xml_files:
-    content = xml_file.read_text(encoding="utf-8")
-    dom = defusedxml.minidom.parseString(content)
-    xml_file.write_bytes(dom.toprettyxml(indent="  ", encoding="ascii"))
-
-# .docxの場合、追跡変更（tracked changes）用にRSID候補を提案
-if input_file.endswith(".docx"):
-    suggested_rsid = "".join(random.choices("0123456789ABCDEF", k=8))
-    print(f"Suggested RSID for edit session: {suggested_rsid}")
+import lxml.etree
+
+# 信頼できない入力を想定し、外部エンティティやネットワークアクセスは無効化する（pack.pyと同じ設定）
+# パーサーは全ファイルで使い回す
+_PARSER = lxml.etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+# タグ間の空白（XML宣言直後の改行は除く）。無ければ整形済みの箇所が無いので空白除去を省略できる
+_INDENTED = re.compile(rb"(?<!\?)>\s+<")
+# この大きさ未満で既に複数行になっているXMLは整形済みとみなし、パース/書き戻しを省略する
+_SMALL_XML_BYTES = 512
+
+
+def main():
+    # コマンドライン引数を取得
+    assert len(sys.argv) == 3, "Usage: python unpack.py <office_file> <output_dir>"
+    input_file, output_dir = sys.argv[1], sys.argv[2]
+
+    # 展開して整形
+    # XMLはzipから読んだバイト列をそのまま整形して1回だけ書き込む
+    # （ファイルごとに独立しているためプロセスで並列化。各プロセスが自前のパーサーを持つ）
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(input_file) as zf, ProcessPoolExecutor() as executor:
+        futures = []
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.endswith((".xml", ".rels")):
+                zf.extract(info, output_path)
+                continue
+            xml_file = _member_path(output_path, info.filename)
+            xml_file.parent.mkdir(parents=True, exist_ok=True)
+            data = zf.read(info)
+            if _is_small_and_formatted(data):
+                xml_file.write_bytes(data)
+            else:
+                futures.append(executor.submit(pretty_print_xml, data, xml_file))
+        for future in futures:
+            future.result()
+
+    # .docxの場合、追跡変更（tracked changes）用にRSID候補を提案
+    if input_file.endswith(".docx"):
+        suggested_rsid = "".join(random.choices("0123456789ABCDEF", k=8))
+        print(f"Suggested RSID for edit session: {suggested_rsid}")
+
+
+def pretty_print_xml(data, xml_file):
+    """XMLのバイト列を整形し、xml_fileに書き込みます。"""
+    root = lxml.etree.fromstring(data, _PARSER)
+    if _INDENTED.search(data):
+        # lxmlは既存の空白があると字下げし直さないため、子要素間の空白だけを取り除く
+        # （w:t等のテキストは子を持たない要素にあるので残る）
+        for element in root.iter(lxml.etree.Element):
+            if len(element):
+                if element.text and element.text.isspace():
+                    element.text = None
+                for child in element:
+                    if child.tail and child.tail.isspace():
+                        child.tail = None
+    tree = root.getroottree()
+    # minidomと違いstandalone宣言を保持するので、pack.pyで書き戻したときも元の宣言が残る
+    tree.write(
+        str(xml_file),
+        pretty_print=True,
+        encoding="ascii",
+        xml_declaration=True,
+        standalone=tree.docinfo.standalone,
+    )
+
+
+def _is_small_and_formatted(data):
+    """既に改行で整形された小さなファイル（.rels等）なら、パースせずそのまま書き出してよいと判定します。"""
+    return len(data) < _SMALL_XML_BYTES and data.count(b"\n") > 2
+
+
+def _member_path(output_path, filename):
+    """extractallと同じく、zip内の名前から空要素・"."・".."を除いた展開先パスを返します。"""
+    parts = [part for part in filename.split("/") if part not in ("", ".", "..")]
+    return output_path.joinpath(*parts)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,38 @@
 Word文書における追跡変更（tracked changes）を検証するバリデータです。
 """
 
+import difflib
+import io
+import os
 import subprocess
 import tempfile
 import zipfile
 from pathlib import Path
 
+import lxml.etree
+
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# 1にするとgitのword diffで差分を表示する（従来の出力と完全に揃えたい場合向け）
+GIT_DIFF_ENV = "REDLINING_GIT_DIFF"
+
 
 class RedliningValidator:
     """Word文書の追跡変更（tracked changes）を検証します。"""
 
+    # 名前空間付きタグ名は走査中に何度も比較するため、クラス定義時に一度だけ組み立てる
+    _INS = f"{{{W_NAMESPACE}}}ins"
+    _DEL = f"{{{W_NAMESPACE}}}del"
+    _P = f"{{{W_NAMESPACE}}}p"
+    _T = f"{{{W_NAMESPACE}}}t"
+    _DELTEXT = f"{{{W_NAMESPACE}}}delText"
+    _AUTHOR = f"{{{W_NAMESPACE}}}author"
+
     def __init__(self, unpacked_dir, original_docx, verbose=False):
         self.unpacked_dir = Path(unpacked_dir)
         self.original_docx = Path(original_docx)
         self.verbose = verbose
-        self.namespaces = {
-            "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
-        }
+        self.namespaces = {"w": W_NAMESPACE}
 
     def validate(self):
         """メイン検証。妥当ならTrue、そうでなければFalseを返します。"""
@@ -27,92 +43,62 @@ class RedliningValidator:
             print(f"FAILED - 変更後のdocument.xmlが見つかりません: {modified_file}")
             return False
 
-        # まず、Claudeによる追跡変更が存在するか確認（存在しないならredlining検証は不要）
+        # 1回のストリーミング走査で、Claudeの追跡変更の有無の判定と
+        # （Claudeの変更を除いた）本文テキストの抽出を同時に行う
+        modified_data = modified_file.read_bytes()
         try:
-            import xml.etree.ElementTree as ET
-
-            tree = ET.parse(modified_file)
-            root = tree.getroot()
-
-            # Claudeがauthorになっている w:del / w:ins を探す
-            del_elements = root.findall(".//w:del", self.namespaces)
-            ins_elements = root.findall(".//w:ins", self.namespaces)
-
-            # Claudeの変更だけに絞り込む
-            claude_del_elements = [
-                elem
-                for elem in del_elements
-                if elem.get(f"{{{self.namespaces['w']}}}author") == "Claude"
-            ]
-            claude_ins_elements = [
-                elem
-                for elem in ins_elements
-                if elem.get(f"{{{self.namespaces['w']}}}author") == "Claude"
-            ]
-
-            # Claudeの追跡変更が使われている場合のみredlining検証が必要
-            if not claude_del_elements and not claude_ins_elements:
-                if self.verbose:
-                    print("PASSED - Claudeによる追跡変更が見つかりませんでした。")
-                return True
-
-        except Exception:
-            # XMLをパースできない場合は、通常のフル検証に進む
-            pass
+            modified_text, has_claude_changes = self._extract_non_claude_text(
+                modified_data
+            )
+        except lxml.etree.XMLSyntaxError as e:
+            print(f"FAILED - XMLパースエラー: {e}")
+            return False
 
-        # 元のdocxを展開するため一時ディレクトリを作成
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-
-            # 元docxを展開
-            try:
-                with zipfile.ZipFile(self.original_docx, "r") as zip_ref:
-                    zip_ref.extractall(temp_path)
-            except Exception as e:
-                print(f"FAILED - 元docxの展開エラー: {e}")
-                return False
-
-            original_file = temp_path / "word" / "document.xml"
-            if not original_file.exists():
-                print(
-                    f"FAILED - 元docx内に document.xml が見つかりません: {self.original_docx}"
-                )
-                return False
-
-            # redlining検証のため、両方のXMLをxml.etree.ElementTreeでパース
-            try:
-                import xml.etree.ElementTree as ET
-
-                modified_tree = ET.parse(modified_file)
-                modified_root = modified_tree.getroot()
-                original_tree = ET.parse(original_file)
-                original_root = original_tree.getroot()
-            except ET.ParseError as e:
-                print(f"FAILED - XMLパースエラー: {e}")
-                return False
-
-            # 両ドキュメントからClaudeの追跡変更を除去
-            self._remove_claude_tracked_changes(original_root)
-            self._remove_claude_tracked_changes(modified_root)
-
-            # テキスト内容を抽出して比較
-            modified_text = self._extract_text_content(modified_root)
-            original_text = self._extract_text_content(original_root)
-
-            if modified_text != original_text:
-                # 文字単位の差分を提示
-                error_message = self._generate_detailed_diff(
-                    original_text, modified_text
-                )
-                print(error_message)
-                return False
+        # Claudeの追跡変更が使われている場合のみredlining検証が必要
+        if not has_claude_changes:
+            if self.verbose:
+                print("PASSED - Claudeによる追跡変更が見つかりませんでした。")
+            return True
+
+        # 元docxからは document.xml だけを読み込む（他のパーツは展開しない）
+        try:
+            with zipfile.ZipFile(self.original_docx, "r") as zip_ref:
+                try:
+                    original_data = zip_ref.read("word/document.xml")
+                except KeyError:
+                    print(
+                        f"FAILED - 元docx内に document.xml が見つかりません: {self.original_docx}"
+                    )
+                    return False
+        except Exception as e:
+            print(f"FAILED - 元docxの展開エラー: {e}")
+            return False
 
+        # バイト列が同一なら本文も一致するため、パースと比較を省略
+        if modified_data == original_data:
             if self.verbose:
-                print("PASSED - Claudeの変更はすべて追跡変更として正しく記録されています")
+                print("PASSED - document.xml は元ファイルから変更されていません")
             return True
 
+        # 元ドキュメントも同じ走査で、Claudeの追跡変更を除いたテキストを抽出
+        try:
+            original_text, _ = self._extract_non_claude_text(original_data)
+        except lxml.etree.XMLSyntaxError as e:
+            print(f"FAILED - XMLパースエラー: {e}")
+            return False
+
+        if modified_text != original_text:
+            # 文字単位の差分を提示
+            error_message = self._generate_detailed_diff(original_text, modified_text)
+            print(error_message)
+            return False
+
+        if self.verbose:
+            print("PASSED - Claudeの変更はすべて追跡変更として正しく記録されています")
+        return True
+
     def _generate_detailed_diff(self, original_text, modified_text):
-        """gitのword diffを使って、詳細な差分（単語/文字レベル）を生成します。"""
+        """詳細な差分（文字レベル）を含むエラーメッセージを生成します。"""
         error_parts = [
             "FAILED - Claudeの追跡変更を除去した後のドキュメント本文が一致しません",
             "",
@@ -127,15 +113,62 @@ class RedliningValidator:
             "",
         ]
 
-        # gitのword diffを表示
-        git_diff = self._get_git_word_diff(original_text, modified_text)
-        if git_diff:
-            error_parts.extend(["差分:", "============", git_diff])
+        # word diffを表示（既定はプロセス内のdifflib、環境変数指定時のみgit）
+        if os.environ.get(GIT_DIFF_ENV) == "1":
+            word_diff = self._get_git_word_diff(original_text, modified_text)
+        else:
+            word_diff = self._get_word_diff(original_text, modified_text)
+        if word_diff:
+            error_parts.extend(["差分:", "============", word_diff])
         else:
             error_parts.append("word diffを生成できません（gitが利用できない可能性があります）")
 
         return "\n".join(error_parts)
 
+    def _get_word_diff(self, original_text, modified_text):
+        """difflibで、git diff --word-diff=plain 形式の文字単位diffを生成します。
+
+        変更のあった段落（行）だけを、[-削除-]{+追加+} の印付きで返します。
+        """
+        original_lines = original_text.split("\n")
+        modified_lines = modified_text.split("\n")
+        line_matcher = difflib.SequenceMatcher(
+            None, original_lines, modified_lines, autojunk=False
+        )
+
+        content_lines = []
+        for tag, i1, i2, j1, j2 in line_matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            old = "\n".join(original_lines[i1:i2])
+            new = "\n".join(modified_lines[j1:j2])
+            char_matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+            parts = []
+            for op, a1, a2, b1, b2 in char_matcher.get_opcodes():
+                if op == "equal":
+                    parts.append(old[a1:a2])
+                    continue
+                # 段落をまたぐ変更は、gitと同様に行ごとに印を付ける
+                if a2 > a1:
+                    parts.append(
+                        "\n".join(
+                            f"[-{piece}-]" if piece else ""
+                            for piece in old[a1:a2].split("\n")
+                        )
+                    )
+                if b2 > b1:
+                    parts.append(
+                        "\n".join(
+                            f"{{+{piece}+}}" if piece else ""
+                            for piece in new[b1:b2].split("\n")
+                        )
+                    )
+            content_lines.extend(
+                line for line in "".join(parts).split("\n") if line.strip()
+            )
+
+        return "\n".join(content_lines) or None
+
     def _get_git_word_diff(self, original_text, modified_text):
         """gitでword diffを生成します（可能なら文字単位で精密に）。"""
         try:
@@ -214,65 +247,60 @@ class RedliningValidator:
 
         return None
 
-    def _remove_claude_tracked_changes(self, root):
-        """XMLルートから、Claudeがauthorの追跡変更を除去します。"""
-        ins_tag = f"{{{self.namespaces['w']}}}ins"
-        del_tag = f"{{{self.namespaces['w']}}}del"
-        author_attr = f"{{{self.namespaces['w']}}}author"
-
-        # w:ins 要素を除去
-        for parent in root.iter():
-            to_remove = []
-            for child in parent:
-                if child.tag == ins_tag and child.get(author_attr) == "Claude":
-                    to_remove.append(child)
-            for elem in to_remove:
-                parent.remove(elem)
-
-        # Unwrap content in w:del elements where author is "Claude"
-        deltext_tag = f"{{{self.namespaces['w']}}}delText"
-        t_tag = f"{{{self.namespaces['w']}}}t"
-
-        for parent in root.iter():
-            to_process = []
-            for child in parent:
-                if child.tag == del_tag and child.get(author_attr) == "Claude":
-                    to_process.append((child, list(parent).index(child)))
-
-            # インデックスを維持するため逆順に処理
-            for del_elem, del_index in reversed(to_process):
-                # 移動前に w:delText を w:t に変換
-                for elem in del_elem.iter():
-                    if elem.tag == deltext_tag:
-                        elem.tag = t_tag
-
-                # Move all children of w:del to its parent before removing w:del
-                for child in reversed(list(del_elem)):
-                    parent.insert(del_index, child)
-                parent.remove(del_elem)
-
-    def _extract_text_content(self, root):
-        """Word XMLからテキスト内容を抽出し、段落構造を保ちます。
+    def _extract_non_claude_text(self, data):
+        """Claudeの追跡変更を除いた本文テキストを、DOMを作らずに1回の走査で抽出します。
+
+        Claudeの w:ins 内のテキストは無視し、Claudeの w:del 内の w:delText は
+        w:t と同様に扱います。段落構造は改行で保ちます。
 
         追跡変更の挿入が「テキストのない構造要素」だけを追加するケースでは、
         空段落が誤検知（false positive）の原因になり得るためスキップします。
-        """
-        p_tag = f"{{{self.namespaces['w']}}}p"
-        t_tag = f"{{{self.namespaces['w']}}}t"
 
+        Returns:
+            tuple: (本文テキスト, Claudeの追跡変更が1つでもあればTrue)
+        """
         paragraphs = []
-        for p_elem in root.findall(f".//{p_tag}"):
-            # この段落内のテキスト要素を収集
-            text_parts = []
-            for t_elem in p_elem.findall(f".//{t_tag}"):
-                if t_elem.text:
-                    text_parts.append(t_elem.text)
-            paragraph_text = "".join(text_parts)
-            # 空段落はスキップ（内容検証に影響しない）
-            if paragraph_text:
-                paragraphs.append(paragraph_text)
-
-        return "\n".join(paragraphs)
+        text_parts = None
+        claude_ins_depth = 0
+        claude_del_depth = 0
+        has_claude_changes = False
+
+        for event, elem in lxml.etree.iterparse(
+            io.BytesIO(data), events=("start", "end"), huge_tree=True
+        ):
+            tag = elem.tag
+            if event == "start":
+                if tag == self._INS or tag == self._DEL:
+                    if elem.get(self._AUTHOR) == "Claude":
+                        has_claude_changes = True
+                        if tag == self._INS:
+                            claude_ins_depth += 1
+                        else:
+                            claude_del_depth += 1
+                elif tag == self._P and not claude_ins_depth:
+                    # 空段落はスキップ（内容検証に影響しない）
+                    if text_parts:
+                        paragraphs.append("".join(text_parts))
+                    text_parts = []
+                continue
+
+            if tag == self._T or (tag == self._DELTEXT and claude_del_depth):
+                if not claude_ins_depth and text_parts is not None and elem.text:
+                    text_parts.append(elem.text)
+            elif (tag == self._INS or tag == self._DEL) and elem.get(
+                self._AUTHOR
+            ) == "Claude":
+                if tag == self._INS:
+                    claude_ins_depth -= 1
+                else:
+                    claude_del_depth -= 1
+            # 処理済みの要素は解放してメモリを抑える（属性は上で参照済み）
+            elem.clear()
+
+        if text_parts:
+            paragraphs.append("".join(text_parts))
+
+        return "\n".join(paragraphs), has_claude_changes
 
 
 if __name__ == "__main__":
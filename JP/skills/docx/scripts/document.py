@@ -28,23 +28,106 @@ Word文書を扱うためのライブラリ（コメント、追跡変更、編
     doc.save()
 """
 
+import copy
 import html
-import random
+import os
+import re
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
-from defusedxml import minidom
-from ooxml.scripts.pack import pack_document
+import lxml.etree
+from ooxml.scripts.pack import _reflink, pack_document
 from ooxml.scripts.validation.docx import DOCXSchemaValidator
 from ooxml.scripts.validation.redlining import RedliningValidator
 
-from .utilities import XMLEditor
+from .utilities import XML_NAMESPACE, XML_PARSER, XMLEditor
 
 # テンプレートファイルのパス
 TEMPLATE_DIR = Path(__file__).parent / "templates"
 
+# 本モジュールで扱う名前空間（接頭辞 → URI）
+NAMESPACES = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "w14": "http://schemas.microsoft.com/office/word/2010/wordml",
+    "w15": "http://schemas.microsoft.com/office/word/2012/wordml",
+    "w16cex": "http://schemas.microsoft.com/office/word/2018/wordml/cex",
+    "w16cid": "http://schemas.microsoft.com/office/word/2016/wordml/cid",
+    "w16du": "http://schemas.microsoft.com/office/word/2023/wordml/word16du",
+    "xml": XML_NAMESPACE,
+}
+
+
+def _qn(name: str) -> str:
+    """"w:p" のような接頭辞付きの名前をClark表記（{uri}p）に変換します。"""
+    prefix, local = name.split(":")
+    return f"{{{NAMESPACES[prefix]}}}{local}"
+
+
+# 自動付与・書き換えする属性名（Clark表記）
+W_ID = _qn("w:id")
+W_AUTHOR = _qn("w:author")
+W_DATE = _qn("w:date")
+W_INITIALS = _qn("w:initials")
+W_RSID_R = _qn("w:rsidR")
+W_RSID_R_DEFAULT = _qn("w:rsidRDefault")
+W_RSID_P = _qn("w:rsidP")
+W_RSID_DEL = _qn("w:rsidDel")
+W14_PARA_ID = _qn("w14:paraId")
+W14_TEXT_ID = _qn("w14:textId")
+W16DU_DATE_UTC = _qn("w16du:dateUtc")
+W16CEX_DATE_UTC = _qn("w16cex:dateUtc")
+XML_SPACE = _qn("xml:space")
+W_VAL = _qn("w:val")
+
+# 走査・生成で使う要素名（Clark表記、モジュール読み込み時に1度だけ組み立てる）
+W_P = _qn("w:p")
+W_R = _qn("w:r")
+W_T = _qn("w:t")
+W_DEL_TEXT = _qn("w:delText")
+W_INS = _qn("w:ins")
+W_DEL = _qn("w:del")
+W_PPR = _qn("w:pPr")
+W_RPR = _qn("w:rPr")
+W_NUM_PR = _qn("w:numPr")
+W_COMMENT = _qn("w:comment")
+W_TRACK_REVISIONS = _qn("w:trackRevisions")
+W_DOCUMENT_PROTECTION = _qn("w:documentProtection")
+W_DEFAULT_TAB_STOP = _qn("w:defaultTabStop")
+W_RSIDS = _qn("w:rsids")
+W_RSID = _qn("w:rsid")
+W_COMPAT = _qn("w:compat")
+W_CLR_SCHEME_MAPPING = _qn("w:clrSchemeMapping")
+W16CEX_COMMENT_EXTENSIBLE = _qn("w16cex:commentExtensible")
+
+# コメント範囲/参照の定型断片（w:id だけが異なるため、パース済みの雛形をコピーして使う）
+_COMMENT_RANGE_START_XML = '<w:commentRangeStart w:id="{value}"/>'
+_COMMENT_RANGE_END_ONLY_XML = '<w:commentRangeEnd w:id="{value}"/>'
+_COMMENT_REF_RUN_XML = '''<w:r>
+  <w:rPr><w:rStyle w:val="CommentReference"/></w:rPr>
+  <w:commentReference w:id="{value}"/>
+</w:r>'''
+_COMMENT_RANGE_END_XML = _COMMENT_RANGE_END_ONLY_XML + "\n" + _COMMENT_REF_RUN_XML
+
+# テキストノード用のXMLエスケープ表（1パスで & < > を置換する）
+_XML_TEXT_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+# 数値として扱うID属性値（w:id など）
+_DECIMAL = re.compile(r"[0-9]+")
+
+
+def _set_missing_attributes(elem, defaults):
+    """defaultsのうち要素にまだ無い属性だけを、1回のupdateでまとめて設定します。
+
+    lxmlの属性辞書にはsetdefaultが無いため、不足分を集めてから書き込みます。
+    """
+    attrib = elem.attrib
+    missing = {name: value for name, value in defaults.items() if name not in attrib}
+    if missing:
+        attrib.update(missing)
+
 
 class DocxXMLEditor(XMLEditor):
     """新しい要素にRSID/author/date等を自動付与するXMLEditorです。
@@ -55,7 +138,7 @@ class DocxXMLEditor(XMLEditor):
     - w:id（w:ins / w:del 要素向け）
 
     属性:
-        dom (defusedxml.minidom.Document): 直接操作用のDOMドキュメント
+        dom (lxml.etree._ElementTree): 直接操作用のlxmlツリー
     """
 
     def __init__(
@@ -73,47 +156,63 @@ class DocxXMLEditor(XMLEditor):
         self.rsid = rsid
         self.author = author
         self.initials = initials
+        # 次に払い出す変更ID（初回採番時にドキュメントを1度だけ走査して決定）
+        self._next_change_id = None
+        # 付与するタイムスタンプと、ルートで宣言済みと確認した名前空間（editor単位で再利用）
+        self._timestamp = None
+        self._ns_declared = set()
+        # 属性注入用のタグ別ハンドラ（(rsid, author, initials, timestamp)をキーに1度だけ構築）
+        self._inject_handlers = None
 
     def _get_next_change_id(self):
-        """追跡変更要素を走査して、次に利用可能な変更IDを取得します。"""
-        max_id = -1
-        for tag in ("w:ins", "w:del"):
-            elements = self.dom.getElementsByTagName(tag)
-            for elem in elements:
-                change_id = elem.getAttribute("w:id")
+        """次に利用可能な変更IDを払い出します。
+
+        初回のみ追跡変更要素を走査して最大IDを求め、以降はカウンタを進めるだけにします。
+        """
+        if self._next_change_id is None:
+            max_id = -1
+            for elem in self.dom.iter(W_INS, W_DEL):
+                change_id = elem.get(W_ID)
                 if change_id:
                     try:
                         max_id = max(max_id, int(change_id))
                     except ValueError:
                         pass
-        return max_id + 1
-
-    def _ensure_w16du_namespace(self):
-        """ルート要素にw16du名前空間が宣言されていることを保証します。"""
-        root = self.dom.documentElement
-        if not root.hasAttribute("xmlns:w16du"):  # type: ignore
-            root.setAttribute(  # type: ignore
-                "xmlns:w16du",
-                "http://schemas.microsoft.com/office/word/2023/wordml/word16du",
-            )
+            self._next_change_id = max_id + 1
 
-    def _ensure_w16cex_namespace(self):
-        """ルート要素にw16cex名前空間が宣言されていることを保証します。"""
-        root = self.dom.documentElement
-        if not root.hasAttribute("xmlns:w16cex"):  # type: ignore
-            root.setAttribute(  # type: ignore
-                "xmlns:w16cex",
-                "http://schemas.microsoft.com/office/word/2018/wordml/cex",
-            )
+        change_id = self._next_change_id
+        self._next_change_id += 1
+        return change_id
 
-    def _ensure_w14_namespace(self):
-        """ルート要素にw14名前空間が宣言されていることを保証します。"""
-        root = self.dom.documentElement
-        if not root.hasAttribute("xmlns:w14"):  # type: ignore
-            root.setAttribute(  # type: ignore
-                "xmlns:w14",
-                "http://schemas.microsoft.com/office/word/2010/wordml",
-            )
+    def _reserve_change_id(self, change_id):
+        """挿入された要素が明示的に持つ変更IDと、以降の採番が衝突しないようにします。"""
+        if self._next_change_id is None:
+            # 未走査なら、初回採番時の走査でこのIDも考慮される
+            return
+        try:
+            self._next_change_id = max(self._next_change_id, int(change_id) + 1)
+        except ValueError:
+            pass
+
+    def _ensure_namespace(self, prefix):
+        """ルート要素に指定接頭辞の名前空間が宣言されていることを保証します。
+
+        lxmlでは既存要素へ名前空間宣言を直接追加できないため、
+        cleanup_namespaces の top_nsmap でルートへ宣言を追加します。
+        既存の宣言は keep_ns_prefixes で削除されないよう保持します。
+        """
+        if prefix in self._ns_declared:
+            return
+        self._ns_declared.add(prefix)
+        root = self.dom.getroot()
+        if prefix in root.nsmap:
+            return
+        keep = [p for p in root.nsmap if p] + [prefix]
+        lxml.etree.cleanup_namespaces(
+            root, top_nsmap={prefix: NAMESPACES[prefix]}, keep_ns_prefixes=keep
+        )
+        # ルートの宣言が変わったので、断片用の名前空間宣言を作り直させる
+        self._ns_decl = None
 
     def _inject_attributes_to_nodes(self, nodes):
         """必要に応じて、DOMノードへRSID/author/date属性を注入（付与）します。
@@ -127,117 +226,130 @@ class DocxXMLEditor(XMLEditor):
         - w16cex:commentExtensible: w16cex:dateUtc
 
         引数:
-            nodes: 処理対象のDOMノードリスト
+            nodes: 処理対象のlxml要素リスト
         """
-        from datetime import datetime, timezone
-
-        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        # 編集セッション中の変更は同一時刻として扱い、タイムスタンプの生成は1度だけにする
+        if self._timestamp is None:
+            self._timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        key = (self.rsid, self.author, self.initials, self._timestamp)
+        if self._inject_handlers is None or self._inject_handlers[0] != key:
+            handlers, add_rsid_to_r = self._build_inject_handlers(self._timestamp)
+            self._inject_handlers = (key, handlers, add_rsid_to_r)
+        _, handlers, add_rsid_to_r = self._inject_handlers
+        # ホットループ内ではローカル変数として参照する
+        w_del = W_DEL
+        w_r = W_R
+        tags = [*handlers, w_r]
 
         def is_inside_deletion(elem):
             """要素がw:del要素の内側にあるかを判定します。"""
-            parent = elem.parentNode
-            while parent:
-                if parent.nodeType == parent.ELEMENT_NODE and parent.tagName == "w:del":
-                    return True
-                parent = parent.parentNode
-            return False
+            return any(True for _ in elem.iterancestors(w_del))
+
+        for node in nodes:
+            if not isinstance(node.tag, str):
+                continue
+
+            # ノード自身と子孫を1回の走査で処理（iterwalkはノード自身も含み、対象タグのみ返す）
+            # 祖先側のw:delはノードごとに1度だけ確認し、サブツリー内はw:delの入れ子数で追跡する
+            del_depth = 1 if is_inside_deletion(node) else 0
+            for event, elem in lxml.etree.iterwalk(
+                node, events=("start", "end"), tag=tags
+            ):
+                tag = elem.tag
+                if event == "end":
+                    if tag == w_del:
+                        del_depth -= 1
+                elif tag == w_r:
+                    add_rsid_to_r(elem, del_depth > 0)
+                else:
+                    handlers[tag](elem)
+                    if tag == w_del:
+                        del_depth += 1
+
+    def _build_inject_handlers(self, timestamp):
+        """属性注入用のタグ別ハンドラを構築します。
+
+        rsid/author/initials/timestamp から作る既定属性は呼び出しごとに不変なので、
+        クロージャへ束縛した状態でeditorに保持し、注入のたびに組み立て直さないようにします。
+
+        戻り値:
+            (タグ→ハンドラの辞書, w:r用ハンドラ) のタプル
+        """
+        # 要素種別ごとの既定属性（キーが変わらない限り不変なので先に組み立てる）
+        p_defaults = {
+            W_RSID_R: self.rsid,
+            W_RSID_R_DEFAULT: self.rsid,
+            W_RSID_P: self.rsid,
+        }
+        r_defaults = {W_RSID_R: self.rsid}
+        deleted_r_defaults = {W_RSID_DEL: self.rsid}
+        change_defaults = {W_AUTHOR: self.author, W_DATE: timestamp}
+        comment_defaults = {
+            W_AUTHOR: self.author,
+            W_DATE: timestamp,
+            W_INITIALS: self.initials,
+        }
 
         def add_rsid_to_p(elem):
-            if not elem.hasAttribute("w:rsidR"):
-                elem.setAttribute("w:rsidR", self.rsid)
-            if not elem.hasAttribute("w:rsidRDefault"):
-                elem.setAttribute("w:rsidRDefault", self.rsid)
-            if not elem.hasAttribute("w:rsidP"):
-                elem.setAttribute("w:rsidP", self.rsid)
+            _set_missing_attributes(elem, p_defaults)
             # w14:paraId と w14:textId が無ければ追加
-            if not elem.hasAttribute("w14:paraId"):
-                self._ensure_w14_namespace()
-                elem.setAttribute("w14:paraId", _generate_hex_id())
-            if not elem.hasAttribute("w14:textId"):
-                self._ensure_w14_namespace()
-                elem.setAttribute("w14:textId", _generate_hex_id())
-
-        def add_rsid_to_r(elem):
+            attrib = elem.attrib
+            if W14_PARA_ID not in attrib or W14_TEXT_ID not in attrib:
+                self._ensure_namespace("w14")
+                if W14_PARA_ID not in attrib:
+                    attrib[W14_PARA_ID] = _generate_hex_id()
+                if W14_TEXT_ID not in attrib:
+                    attrib[W14_TEXT_ID] = _generate_hex_id()
+
+        def add_rsid_to_r(elem, inside_deletion):
             # <w:del> 内の <w:r> には w:rsidDel、それ以外は w:rsidR を使う
-            if is_inside_deletion(elem):
-                if not elem.hasAttribute("w:rsidDel"):
-                    elem.setAttribute("w:rsidDel", self.rsid)
-            else:
-                if not elem.hasAttribute("w:rsidR"):
-                    elem.setAttribute("w:rsidR", self.rsid)
+            _set_missing_attributes(
+                elem, deleted_r_defaults if inside_deletion else r_defaults
+            )
 
         def add_tracked_change_attrs(elem):
             # w:id が無ければ自動採番
-            if not elem.hasAttribute("w:id"):
-                elem.setAttribute("w:id", str(self._get_next_change_id()))
-            if not elem.hasAttribute("w:author"):
-                elem.setAttribute("w:author", self.author)
-            if not elem.hasAttribute("w:date"):
-                elem.setAttribute("w:date", timestamp)
+            attrib = elem.attrib
+            change_id = attrib.get(W_ID)
+            if change_id is None:
+                attrib[W_ID] = str(self._get_next_change_id())
+            else:
+                self._reserve_change_id(change_id)
+            _set_missing_attributes(elem, change_defaults)
             # 追跡変更用に w16du:dateUtc を追加（UTCタイムスタンプ生成のため w:date と同値）
-            if elem.tagName in ("w:ins", "w:del") and not elem.hasAttribute(
-                "w16du:dateUtc"
-            ):
-                self._ensure_w16du_namespace()
-                elem.setAttribute("w16du:dateUtc", timestamp)
+            if W16DU_DATE_UTC not in attrib:
+                self._ensure_namespace("w16du")
+                attrib[W16DU_DATE_UTC] = timestamp
 
         def add_comment_attrs(elem):
-            if not elem.hasAttribute("w:author"):
-                elem.setAttribute("w:author", self.author)
-            if not elem.hasAttribute("w:date"):
-                elem.setAttribute("w:date", timestamp)
-            if not elem.hasAttribute("w:initials"):
-                elem.setAttribute("w:initials", self.initials)
+            _set_missing_attributes(elem, comment_defaults)
 
         def add_comment_extensible_date(elem):
             # comment extensible要素用に w16cex:dateUtc を追加
-            if not elem.hasAttribute("w16cex:dateUtc"):
-                self._ensure_w16cex_namespace()
-                elem.setAttribute("w16cex:dateUtc", timestamp)
+            if W16CEX_DATE_UTC not in elem.attrib:
+                self._ensure_namespace("w16cex")
+                elem.set(W16CEX_DATE_UTC, timestamp)
 
         def add_xml_space_to_t(elem):
             # 先頭/末尾に空白がある w:t には xml:space=\"preserve\" を付与
+            # 大半のw:tは両端が空白でないため、境界文字の判定を先に行い早期に抜ける
+            text = elem.text
             if (
-                elem.firstChild
-                and elem.firstChild.nodeType == elem.firstChild.TEXT_NODE
+                text
+                and (text[0].isspace() or text[-1].isspace())
+                and XML_SPACE not in elem.attrib
             ):
-                text = elem.firstChild.data
-                if text and (text[0].isspace() or text[-1].isspace()):
-                    if not elem.hasAttribute("xml:space"):
-                        elem.setAttribute("xml:space", "preserve")
-
-        for node in nodes:
-            if node.nodeType != node.ELEMENT_NODE:
-                continue
-
-            # ノード自身を処理
-            if node.tagName == "w:p":
-                add_rsid_to_p(node)
-            elif node.tagName == "w:r":
-                add_rsid_to_r(node)
-            elif node.tagName == "w:t":
-                add_xml_space_to_t(node)
-            elif node.tagName in ("w:ins", "w:del"):
-                add_tracked_change_attrs(node)
-            elif node.tagName == "w:comment":
-                add_comment_attrs(node)
-            elif node.tagName == "w16cex:commentExtensible":
-                add_comment_extensible_date(node)
-
-            # 子孫を処理（getElementsByTagNameは要素自身を返さない）
-            for elem in node.getElementsByTagName("w:p"):
-                add_rsid_to_p(elem)
-            for elem in node.getElementsByTagName("w:r"):
-                add_rsid_to_r(elem)
-            for elem in node.getElementsByTagName("w:t"):
-                add_xml_space_to_t(elem)
-            for tag in ("w:ins", "w:del"):
-                for elem in node.getElementsByTagName(tag):
-                    add_tracked_change_attrs(elem)
-            for elem in node.getElementsByTagName("w:comment"):
-                add_comment_attrs(elem)
-            for elem in node.getElementsByTagName("w16cex:commentExtensible"):
-                add_comment_extensible_date(elem)
+                elem.set(XML_SPACE, "preserve")
+
+        handlers = {
+            W_P: add_rsid_to_p,
+            W_T: add_xml_space_to_t,
+            W_INS: add_tracked_change_attrs,
+            W_DEL: add_tracked_change_attrs,
+            W_COMMENT: add_comment_attrs,
+            W16CEX_COMMENT_EXTENSIBLE: add_comment_extensible_date,
+        }
+        return handlers, add_rsid_to_r
 
     def replace_node(self, elem, new_content):
         """自動属性付与付きでノードを置換します。"""
@@ -263,6 +375,12 @@ class DocxXMLEditor(XMLEditor):
         self._inject_attributes_to_nodes(nodes)
         return nodes
 
+    def insert_element_after(self, elem, new_elem):
+        """自動属性付与付きで、構築済みの要素を要素の後ろに挿入します。"""
+        nodes = super().insert_element_after(elem, new_elem)
+        self._inject_attributes_to_nodes(nodes)
+        return nodes
+
     def revert_insertion(self, elem):
         """挿入（w:ins）を拒否するため、その内容を削除（w:del）として包みます。
 
@@ -289,56 +407,50 @@ class DocxXMLEditor(XMLEditor):
         """
         # 挿入（w:ins）を収集
         ins_elements = []
-        if elem.tagName == "w:ins":
+        if elem.tag == W_INS:
             ins_elements.append(elem)
         else:
-            ins_elements.extend(elem.getElementsByTagName("w:ins"))
+            ins_elements.extend(elem.iterdescendants(W_INS))
 
         # 拒否対象の挿入が存在することを検証
         if not ins_elements:
             raise ValueError(
                 f"revert_insertion には w:ins 要素が必要です。"
-                f"指定された要素 <{elem.tagName}> には挿入（w:ins）が含まれません。"
+                f"指定された要素 <{lxml.etree.QName(elem).localname}> には挿入（w:ins）が含まれません。"
             )
 
         # すべての挿入を処理：子要素をw:delで包む
         for ins_elem in ins_elements:
-            runs = list(ins_elem.getElementsByTagName("w:r"))
+            runs = list(ins_elem.iterdescendants(W_R))
             if not runs:
                 continue
 
             # 削除ラッパーを作成
-            del_wrapper = self.dom.createElement("w:del")
+            del_wrapper = ins_elem.makeelement(W_DEL)
 
             # 各runを処理
             for run in runs:
                 # w:t → w:delText、w:rsidR → w:rsidDel に変換
-                if run.hasAttribute("w:rsidR"):
-                    run.setAttribute("w:rsidDel", run.getAttribute("w:rsidR"))
-                    run.removeAttribute("w:rsidR")
-                elif not run.hasAttribute("w:rsidDel"):
-                    run.setAttribute("w:rsidDel", self.rsid)
-
-                for t_elem in list(run.getElementsByTagName("w:t")):
-                    del_text = self.dom.createElement("w:delText")
-                    # エンティティ対応のため、子ノードをすべてコピー（firstChildだけでなく）
-                    while t_elem.firstChild:
-                        del_text.appendChild(t_elem.firstChild)
-                    for i in range(t_elem.attributes.length):
-                        attr = t_elem.attributes.item(i)
-                        del_text.setAttribute(attr.name, attr.value)
-                    t_elem.parentNode.replaceChild(del_text, t_elem)
+                rsid = run.attrib.pop(W_RSID_R, None)
+                if rsid is not None:
+                    run.set(W_RSID_DEL, rsid)
+                elif run.get(W_RSID_DEL) is None:
+                    run.set(W_RSID_DEL, self.rsid)
+
+                # タグ名の変更だけで、テキスト・子ノード・属性（xml:space等）は保持される
+                for t_elem in list(run.iterdescendants(W_T)):
+                    t_elem.tag = W_DEL_TEXT
 
             # insの子要素をすべてdelラッパーへ移動
-            while ins_elem.firstChild:
-                del_wrapper.appendChild(ins_elem.firstChild)
+            del_wrapper.extend(list(ins_elem))
 
             # delラッパーをins配下へ戻す
-            ins_elem.appendChild(del_wrapper)
+            ins_elem.append(del_wrapper)
 
             # 削除ラッパーへ属性を注入（付与）
             self._inject_attributes_to_nodes([del_wrapper])
 
+        self._mark_rewritten()
         return [elem]
 
     def revert_deletion(self, elem):
@@ -368,18 +480,18 @@ class DocxXMLEditor(XMLEditor):
         """
         # DOM変更の前に、削除（w:del）を先に収集
         del_elements = []
-        is_single_del = elem.tagName == "w:del"
+        is_single_del = elem.tag == W_DEL
 
         if is_single_del:
             del_elements.append(elem)
         else:
-            del_elements.extend(elem.getElementsByTagName("w:del"))
+            del_elements.extend(elem.iterdescendants(W_DEL))
 
         # 拒否対象の削除が存在することを検証
         if not del_elements:
             raise ValueError(
                 f"revert_deletion には w:del 要素が必要です。"
-                f"指定された要素 <{elem.tagName}> には削除（w:del）が含まれません。"
+                f"指定された要素 <{lxml.etree.QName(elem).localname}> には削除（w:del）が含まれません。"
             )
 
         # 生成した挿入を追跡（elemが単一のw:delの場合のみ有効）
@@ -388,46 +500,39 @@ class DocxXMLEditor(XMLEditor):
         # すべての削除を処理：削除内容をコピーした挿入を作る
         for del_elem in del_elements:
             # 削除runを複製し、挿入へ変換
-            runs = list(del_elem.getElementsByTagName("w:r"))
+            runs = list(del_elem.iterdescendants(W_R))
             if not runs:
                 continue
 
             # 挿入ラッパーを作成
-            ins_elem = self.dom.createElement("w:ins")
+            ins_elem = del_elem.makeelement(W_INS)
 
             for run in runs:
                 # runを複製
-                new_run = run.cloneNode(True)
+                new_run = copy.deepcopy(run)
 
                 # w:delText → w:t に変換
-                for del_text in list(new_run.getElementsByTagName("w:delText")):
-                    t_elem = self.dom.createElement("w:t")
-                    # エンティティ対応のため、子ノードをすべてコピー（firstChildだけでなく）
-                    while del_text.firstChild:
-                        t_elem.appendChild(del_text.firstChild)
-                    for i in range(del_text.attributes.length):
-                        attr = del_text.attributes.item(i)
-                        t_elem.setAttribute(attr.name, attr.value)
-                    del_text.parentNode.replaceChild(t_elem, del_text)
+                for del_text in list(new_run.iterdescendants(W_DEL_TEXT)):
+                    del_text.tag = W_T
 
                 # run属性を更新: w:rsidDel → w:rsidR
-                if new_run.hasAttribute("w:rsidDel"):
-                    new_run.setAttribute("w:rsidR", new_run.getAttribute("w:rsidDel"))
-                    new_run.removeAttribute("w:rsidDel")
-                elif not new_run.hasAttribute("w:rsidR"):
-                    new_run.setAttribute("w:rsidR", self.rsid)
+                rsid = new_run.attrib.pop(W_RSID_DEL, None)
+                if rsid is not None:
+                    new_run.set(W_RSID_R, rsid)
+                elif new_run.get(W_RSID_R) is None:
+                    new_run.set(W_RSID_R, self.rsid)
 
-                ins_elem.appendChild(new_run)
+                ins_elem.append(new_run)
 
-            # 新しい挿入を削除の後ろに挿入
-            nodes = self.insert_after(del_elem, ins_elem.toxml())
+            # 新しい挿入を削除の後ろに挿入（シリアライズ/再パースせず要素をそのまま移す）
+            nodes = self.insert_element_after(del_elem, ins_elem)
 
             # 単一w:delを処理している場合、生成した挿入を追跡
             if is_single_del and nodes:
                 created_insertion = nodes[0]
 
         # 入力タイプに応じて返す
-        if is_single_del and created_insertion:
+        if is_single_del and created_insertion is not None:
             return [elem, created_insertion]
         else:
             return [elem]
@@ -444,42 +549,33 @@ class DocxXMLEditor(XMLEditor):
         戻り値:
             str: 追跡変更ラップを追加した変換後XML
         """
-        wrapper = f'<root xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">{xml_content}</root>'
-        doc = minidom.parseString(wrapper)
-        para = doc.getElementsByTagName("w:p")[0]
+        wrapper = f'<root xmlns:w="{NAMESPACES["w"]}">{xml_content}</root>'
+        root = lxml.etree.fromstring(wrapper, XML_PARSER)
+        para = next(root.iter(W_P), None)
+        if para is None:
+            raise ValueError("xml_content に <w:p> 要素が含まれていません")
 
         # w:pPr が存在することを保証
-        pPr_list = para.getElementsByTagName("w:pPr")
-        if not pPr_list:
-            pPr = doc.createElement("w:pPr")
-            para.insertBefore(
-                pPr, para.firstChild
-            ) if para.firstChild else para.appendChild(pPr)
-        else:
-            pPr = pPr_list[0]
+        pPr = next(para.iterdescendants(W_PPR), None)
+        if pPr is None:
+            pPr = para.makeelement(W_PPR)
+            para.insert(0, pPr)
 
         # w:pPr 内に w:rPr が存在することを保証
-        rPr_list = pPr.getElementsByTagName("w:rPr")
-        if not rPr_list:
-            rPr = doc.createElement("w:rPr")
-            pPr.appendChild(rPr)
-        else:
-            rPr = rPr_list[0]
+        rPr = next(pPr.iterdescendants(W_RPR), None)
+        if rPr is None:
+            rPr = lxml.etree.SubElement(pPr, W_RPR)
 
         # w:rPr に <w:ins/> を追加
-        ins_marker = doc.createElement("w:ins")
-        rPr.insertBefore(
-            ins_marker, rPr.firstChild
-        ) if rPr.firstChild else rPr.appendChild(ins_marker)
+        rPr.insert(0, rPr.makeelement(W_INS))
 
         # w:pPr以外の子要素をすべて<w:ins>で包む
-        ins_wrapper = doc.createElement("w:ins")
-        for child in [c for c in para.childNodes if c.nodeName != "w:pPr"]:
-            para.removeChild(child)
-            ins_wrapper.appendChild(child)
-        para.appendChild(ins_wrapper)
+        ins_wrapper = para.makeelement(W_INS)
+        ins_wrapper.extend([c for c in para if c.tag != W_PPR])
+        para.append(ins_wrapper)
 
-        return para.toxml()
+        # 出力には xmlns:w 宣言が付くが、文書へ挿入する際に冗長な宣言として除去される
+        return lxml.etree.tostring(para, encoding="unicode", with_tail=False)
 
     def suggest_deletion(self, elem):
         """w:r または w:p 要素を追跡変更付きの削除としてマークします（DOMをin-placeで操作）。
@@ -489,7 +585,7 @@ class DocxXMLEditor(XMLEditor):
         - w:p（番号付きリスト）: w:pPr 内の w:rPr に <w:del/> を追加し、内容を<w:del>で包みます
 
         引数:
-            elem: 既存の追跡変更がない w:r または w:p のDOM要素
+            elem: 既存の追跡変更がない w:r または w:p の要素
 
         戻り値:
             Element: 変更後の要素
@@ -497,102 +593,82 @@ class DocxXMLEditor(XMLEditor):
         例外:
             ValueError: 既存の追跡変更がある、または構造が不正な場合
         """
-        if elem.nodeName == "w:r":
+        if elem.tag == W_R:
             # 既存のw:delTextがないか確認
-            if elem.getElementsByTagName("w:delText"):
+            if next(elem.iterdescendants(W_DEL_TEXT), None) is not None:
                 raise ValueError("w:r 要素に既に w:delText が含まれています")
 
-            # w:t → w:delText に変換
-            for t_elem in list(elem.getElementsByTagName("w:t")):
-                del_text = self.dom.createElement("w:delText")
-                # エンティティ対応のため、子ノードをすべてコピー（firstChildだけでなく）
-                while t_elem.firstChild:
-                    del_text.appendChild(t_elem.firstChild)
-                # xml:spaceなどの属性を保持
-                for i in range(t_elem.attributes.length):
-                    attr = t_elem.attributes.item(i)
-                    del_text.setAttribute(attr.name, attr.value)
-                t_elem.parentNode.replaceChild(del_text, t_elem)
+            # w:t → w:delText に変換（テキスト・xml:spaceなどの属性は保持される）
+            for t_elem in list(elem.iterdescendants(W_T)):
+                t_elem.tag = W_DEL_TEXT
 
             # run属性を更新: w:rsidR → w:rsidDel
-            if elem.hasAttribute("w:rsidR"):
-                elem.setAttribute("w:rsidDel", elem.getAttribute("w:rsidR"))
-                elem.removeAttribute("w:rsidR")
-            elif not elem.hasAttribute("w:rsidDel"):
-                elem.setAttribute("w:rsidDel", self.rsid)
+            rsid = elem.attrib.pop(W_RSID_R, None)
+            if rsid is not None:
+                elem.set(W_RSID_DEL, rsid)
+            elif elem.get(W_RSID_DEL) is None:
+                elem.set(W_RSID_DEL, self.rsid)
 
             # w:del で包む
-            del_wrapper = self.dom.createElement("w:del")
-            parent = elem.parentNode
-            parent.insertBefore(del_wrapper, elem)
-            parent.removeChild(elem)
-            del_wrapper.appendChild(elem)
+            del_wrapper = elem.makeelement(W_DEL)
+            elem.addprevious(del_wrapper)
+            del_wrapper.append(elem)
 
             # 削除ラッパーへ属性を注入（付与）
             self._inject_attributes_to_nodes([del_wrapper])
+            self._mark_rewritten()
 
             return del_wrapper
 
-        elif elem.nodeName == "w:p":
+        elif elem.tag == W_P:
             # 既存の追跡変更がないか確認
-            if elem.getElementsByTagName("w:ins") or elem.getElementsByTagName("w:del"):
+            if (
+                next(elem.iterdescendants(W_INS, W_DEL), None)
+                is not None
+            ):
                 raise ValueError("w:p 要素に既に追跡変更（tracked changes）が含まれています")
 
             # 番号付きリスト項目か確認
-            pPr_list = elem.getElementsByTagName("w:pPr")
-            is_numbered = pPr_list and pPr_list[0].getElementsByTagName("w:numPr")
+            pPr = next(elem.iterdescendants(W_PPR), None)
+            is_numbered = (
+                pPr is not None
+                and next(pPr.iterdescendants(W_NUM_PR), None) is not None
+            )
 
             if is_numbered:
                 # w:pPr内のw:rPrに <w:del/> を追加
-                pPr = pPr_list[0]
-                rPr_list = pPr.getElementsByTagName("w:rPr")
-
-                if not rPr_list:
-                    rPr = self.dom.createElement("w:rPr")
-                    pPr.appendChild(rPr)
-                else:
-                    rPr = rPr_list[0]
+                rPr = next(pPr.iterdescendants(W_RPR), None)
+                if rPr is None:
+                    rPr = lxml.etree.SubElement(pPr, W_RPR)
 
                 # <w:del/> マーカーを追加
-                del_marker = self.dom.createElement("w:del")
-                rPr.insertBefore(
-                    del_marker, rPr.firstChild
-                ) if rPr.firstChild else rPr.appendChild(del_marker)
-
-            # 全runの w:t → w:delText を変換
-            for t_elem in list(elem.getElementsByTagName("w:t")):
-                del_text = self.dom.createElement("w:delText")
-                # エンティティ対応のため、子ノードをすべてコピー（firstChildだけでなく）
-                while t_elem.firstChild:
-                    del_text.appendChild(t_elem.firstChild)
-                # xml:spaceなどの属性を保持
-                for i in range(t_elem.attributes.length):
-                    attr = t_elem.attributes.item(i)
-                    del_text.setAttribute(attr.name, attr.value)
-                t_elem.parentNode.replaceChild(del_text, t_elem)
+                rPr.insert(0, rPr.makeelement(W_DEL))
+
+            # 全runの w:t → w:delText を変換（テキスト・xml:spaceなどの属性は保持される）
+            for t_elem in list(elem.iterdescendants(W_T)):
+                t_elem.tag = W_DEL_TEXT
 
             # run属性を更新: w:rsidR → w:rsidDel
-            for run in elem.getElementsByTagName("w:r"):
-                if run.hasAttribute("w:rsidR"):
-                    run.setAttribute("w:rsidDel", run.getAttribute("w:rsidR"))
-                    run.removeAttribute("w:rsidR")
-                elif not run.hasAttribute("w:rsidDel"):
-                    run.setAttribute("w:rsidDel", self.rsid)
+            for run in elem.iterdescendants(W_R):
+                rsid = run.attrib.pop(W_RSID_R, None)
+                if rsid is not None:
+                    run.set(W_RSID_DEL, rsid)
+                elif run.get(W_RSID_DEL) is None:
+                    run.set(W_RSID_DEL, self.rsid)
 
             # w:pPr以外の子要素を <w:del> で包む
-            del_wrapper = self.dom.createElement("w:del")
-            for child in [c for c in elem.childNodes if c.nodeName != "w:pPr"]:
-                elem.removeChild(child)
-                del_wrapper.appendChild(child)
-            elem.appendChild(del_wrapper)
+            del_wrapper = elem.makeelement(W_DEL)
+            del_wrapper.extend([c for c in elem if c.tag != W_PPR])
+            elem.append(del_wrapper)
 
             # 削除ラッパーへ属性を注入（付与）
             self._inject_attributes_to_nodes([del_wrapper])
+            self._mark_rewritten()
 
             return elem
 
         else:
-            raise ValueError(f"要素は w:r または w:p である必要があります: {elem.nodeName}")
+            raise ValueError(f"要素は w:r または w:p である必要があります: {elem.tag}")
 
 
 def _generate_hex_id() -> str:
@@ -603,12 +679,36 @@ def _generate_hex_id() -> str:
     - durableId は < 0x7FFFFFFF
     ここでは両方に対して、より厳しい制約（0x7FFFFFFF）を適用します。
     """
-    return f"{random.randint(1, 0x7FFFFFFE):08X}"
+    return f"{int.from_bytes(os.urandom(4), 'big') % 0x7FFFFFFE + 1:08X}"
 
 
 def _generate_rsid() -> str:
     """ランダムな8桁16進RSIDを生成します。"""
-    return "".join(random.choices("0123456789ABCDEF", k=8))
+    return os.urandom(4).hex().upper()
+
+
+def _reflink_or_copy(src, dst):
+    """reflink（copy-on-write）で複製し、非対応のファイルシステムでは通常コピーします。
+
+    ハードリンクは使いません。作業コピーへの置き換えでない書き込み（shutil.copy等）が
+    元ディレクトリのファイルまで書き換えてしまうためです。
+    """
+    if _reflink(src, dst):
+        return dst
+    return shutil.copy2(src, dst)
+
+
+def _copy_if_changed(src, dst):
+    """dstがsrcと同じサイズ・更新時刻（複製後に未変更）ならコピーを省略します。"""
+    src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        return shutil.copy2(src, dst)
+    # 複製時にcopystatで更新時刻を引き継いでいるため、書き込まれたファイルは必ず時刻が変わる
+    if (src_stat.st_size, src_stat.st_mtime_ns) == (dst_stat.st_size, dst_stat.st_mtime_ns):
+        return dst
+    return shutil.copy2(src, dst)
 
 
 class Document:
@@ -621,6 +721,7 @@ class Document:
         track_revisions=False,
         author="Claude",
         initials="C",
+        eager=False,
     ):
         """アンパック済みWordドキュメントのディレクトリを指定して初期化します。
 
@@ -632,6 +733,7 @@ class Document:
             track_revisions: Trueの場合、settings.xmlで追跡変更（track revisions）を有効化します（既定: False）
             author: コメント用の既定著者名（既定: "Claude"）
             initials: コメント用の既定著者イニシャル（既定: "C"）
+            eager: Trueの場合、word/*.xml のeditorをスレッドプールで並列に事前ロードします（既定: False）
         """
         self.original_path = Path(unpacked_dir)
 
@@ -641,11 +743,13 @@ class Document:
         # アンパック内容とベースライン用のサブディレクトリを持つ一時ディレクトリを作成
         self.temp_dir = tempfile.mkdtemp(prefix="docx_")
         self.unpacked_path = Path(self.temp_dir) / "unpacked"
-        shutil.copytree(self.original_path, self.unpacked_path)
+        # ファイルはreflink（不可なら通常コピー）で複製し、作業コピーへの書き込みが元に及ばないようにする
+        shutil.copytree(
+            self.original_path, self.unpacked_path, copy_function=_reflink_or_copy
+        )
 
-        # 検証ベースライン用に、元ディレクトリを一時.docxへパック（unpacked外）
-        self.original_docx = Path(self.temp_dir) / "original.docx"
-        pack_document(self.original_path, self.original_docx, validate=False)
+        # 検証ベースライン用の.docxは、最初の検証時（または元ディレクトリ上書き前）に作成
+        self.original_docx = None
 
         self.word_path = self.unpacked_path / "word"
 
@@ -657,8 +761,11 @@ class Document:
         self.author = author
         self.initials = initials
 
-        # 遅延ロードするeditorのキャッシュ
+        # 遅延ロードするeditorのキャッシュと、save()で書き出す（変更された）ファイル
         self._editors = {}
+        self._dirty = set()
+        if eager:
+            self._preload_editors()
 
         # コメント関連ファイルのパス
         self.comments_path = self.word_path / "comments.xml"
@@ -666,12 +773,13 @@ class Document:
         self.comments_ids_path = self.word_path / "commentsIds.xml"
         self.comments_extensible_path = self.word_path / "commentsExtensible.xml"
 
-        # 既存コメントを読み込み、次のIDを決定（セットアップでファイルを書き換える前）
-        self.existing_comments = self._load_existing_comments()
-        self.next_comment_id = self._get_next_comment_id()
+        # 既存コメントとその次のIDは comments.xml の構造版数をキーにメモ化する
+        # (版数, existing_comments, next_comment_id)
+        self._comments_cache = None
 
         # document.xml editorへの簡易アクセス（準プライベート）
-        self._document = self["word/document.xml"]
+        # （書き出し対象にはコメント追加時に加える）
+        self._document = self._get_editor("word/document.xml")
 
         # 追跡変更の基盤をセットアップ
         self._setup_tracking(track_revisions=track_revisions)
@@ -679,6 +787,16 @@ class Document:
         # people.xml にauthorを追加
         self._add_author_to_people(author)
 
+    @property
+    def existing_comments(self):
+        """既存コメントの {コメントID: {"para_id": ...}} 辞書（返信で親を引くために使用）。"""
+        return self._comments_state()[1]
+
+    @property
+    def next_comment_id(self):
+        """次に利用可能なコメントID。"""
+        return self._comments_state()[2]
+
     def __getitem__(self, xml_path: str) -> DocxXMLEditor:
         """指定されたXMLファイルに対応するDocxXMLEditorを取得（必要なら作成）します。
 
@@ -699,7 +817,15 @@ class Document:
 
             # comments.xml からノードを取得
             comment = doc["word/comments.xml"].get_node(tag="w:comment", attrs={"w:id": "0"})
+
+        注: ここで取得したeditorは直接変更され得るため、save()時に必ず書き出されます。
         """
+        editor = self._get_editor(xml_path)
+        self._dirty.add(xml_path)
+        return editor
+
+    def _get_editor(self, xml_path: str) -> DocxXMLEditor:
+        """editorを取得（必要なら作成）します。読み取り専用の内部処理向けで、変更対象には含めません。"""
         if xml_path not in self._editors:
             file_path = self.unpacked_path / xml_path
             if not file_path.exists():
@@ -732,14 +858,17 @@ class Document:
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
         # document.xml にコメント範囲を即時追加
-        self._document.insert_before(start, self._comment_range_start_xml(comment_id))
+        self._dirty.add("word/document.xml")
+        self._document.insert_before(
+            start, self._comment_range_start_nodes(comment_id)
+        )
 
         # endノードが段落なら、その中にコメントマークアップを追加
         # そうでなければ直後に挿入（runレベルのアンカー用）
-        if end.tagName == "w:p":
-            self._document.append_to(end, self._comment_range_end_xml(comment_id))
+        if end.tag == W_P:
+            self._document.append_to(end, self._comment_range_end_nodes(comment_id))
         else:
-            self._document.insert_after(end, self._comment_range_end_xml(comment_id))
+            self._document.insert_after(end, self._comment_range_end_nodes(comment_id))
 
         # comments.xml に即時追加
         self._add_to_comments_xml(
@@ -756,9 +885,7 @@ class Document:
         self._add_to_comments_extensible_xml(durable_id)
 
         # 返信が動くよう existing_comments を更新
-        self.existing_comments[comment_id] = {"para_id": para_id}
-
-        self.next_comment_id += 1
+        self._record_comment(comment_id, para_id)
         return comment_id
 
     def reply_to_comment(
@@ -788,6 +915,7 @@ class Document:
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
         # document.xml にコメント範囲を即時追加
+        self._dirty.add("word/document.xml")
         parent_start_elem = self._document.get_node(
             tag="w:commentRangeStart", attrs={"w:id": str(parent_comment_id)}
         )
@@ -796,14 +924,17 @@ class Document:
         )
 
         self._document.insert_after(
-            parent_start_elem, self._comment_range_start_xml(comment_id)
+            parent_start_elem, self._comment_range_start_nodes(comment_id)
         )
-        parent_ref_run = parent_ref_elem.parentNode
+        parent_ref_run = parent_ref_elem.getparent()
         self._document.insert_after(
-            parent_ref_run, f'<w:commentRangeEnd w:id="{comment_id}"/>'
+            parent_ref_run,
+            self._document._parse_template(
+                _COMMENT_RANGE_END_ONLY_XML, "w:id", comment_id
+            ),
         )
         self._document.insert_after(
-            parent_ref_run, self._comment_ref_run_xml(comment_id)
+            parent_ref_run, self._comment_ref_run_nodes(comment_id)
         )
 
         # comments.xml に即時追加
@@ -823,9 +954,7 @@ class Document:
         self._add_to_comments_extensible_xml(durable_id)
 
         # 返信が動くよう existing_comments を更新
-        self.existing_comments[comment_id] = {"para_id": para_id}
-
-        self.next_comment_id += 1
+        self._record_comment(comment_id, para_id)
         return comment_id
 
     def __del__(self):
@@ -839,6 +968,8 @@ class Document:
         例外:
             ValueError: 検証に失敗した場合
         """
+        self._ensure_original_docx()
+
         # 現在状態でバリデータを作成
         schema_validator = DOCXSchemaValidator(
             self.unpacked_path, self.original_docx, verbose=False
@@ -847,11 +978,16 @@ class Document:
             self.unpacked_path, self.original_docx, verbose=False
         )
 
-        # 検証を実行
-        if not schema_validator.validate():
-            raise ValueError("スキーマ検証に失敗しました")
-        if not redlining_validator.validate():
-            raise ValueError("追跡変更（redlining）検証に失敗しました")
+        # 両者は互いに独立しているため並列に実行する（解析はスレッドごとのパーサで行われる）
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            schema_ok = pool.submit(schema_validator.validate)
+            redlining_ok = pool.submit(redlining_validator.validate)
+            if not schema_ok.result():
+                # まだ始まっていなければredlining検証は取り消す
+                redlining_ok.cancel()
+                raise ValueError("スキーマ検証に失敗しました")
+            if not redlining_ok.result():
+                raise ValueError("追跡変更（redlining）検証に失敗しました")
 
     def save(self, destination=None, validate=True) -> None:
         """変更したXMLファイルをすべて保存し、保存先ディレクトリへコピーします。
@@ -859,7 +995,8 @@ class Document:
         `add_comment()` や `reply_to_comment()` で行った変更もここで永続化されます。
 
         引数:
-            destination: 保存先パス（任意）。Noneの場合は元ディレクトリへ上書き保存します
+            destination: 保存先パス（任意）。Noneの場合は元ディレクトリへ上書き保存します。
+                         拡張子が .docx の場合は、ディレクトリへコピーせず直接.docxへパックします
             validate: Trueの場合、保存前にドキュメントを検証します（既定: True）
         """
         # コメントファイルがある場合のみ、relationshipとcontent typeを保証
@@ -867,53 +1004,115 @@ class Document:
             self._ensure_comment_relationships()
             self._ensure_comment_content_types()
 
-        # 変更したXMLを一時ディレクトリに保存
-        for editor in self._editors.values():
-            editor.save()
+        # 変更したXMLのみ一時ディレクトリに保存（読み取っただけのファイルは再シリアライズしない）
+        for xml_path in self._dirty:
+            self._editors[xml_path].save()
 
-        # デフォルトで検証する
-        if validate:
+        # デフォルトで検証する（XMLに変更が無ければ元の内容と同じなので検証を省く）
+        if validate and self._dirty:
             self.validate()
 
-        # 一時ディレクトリの内容を保存先（または元ディレクトリ）へコピー
         target_path = Path(destination) if destination else self.original_path
-        shutil.copytree(self.unpacked_path, target_path, dirs_exist_ok=True)
+        if target_path.suffix.lower() == ".docx":
+            # 一時ディレクトリから直接パック（中間ディレクトリへの全ファイルコピーを省く）
+            pack_document(self.unpacked_path, target_path, validate=False)
+            return
+
+        # 一時ディレクトリの内容を保存先（または元ディレクトリ）へコピー
+        # （複製後に変更されていないファイルはコピーしない）
+        if self._dirty and target_path.resolve() == self.original_path.resolve():
+            # 上書き後も検証できるよう、ベースラインを先に確定させる
+            self._ensure_original_docx()
+        shutil.copytree(
+            self.unpacked_path,
+            target_path,
+            dirs_exist_ok=True,
+            copy_function=_copy_if_changed,
+        )
+
+    def _ensure_original_docx(self):
+        """検証ベースライン用に、元ディレクトリを一時.docxへパックします（初回のみ）。"""
+        if self.original_docx is None:
+            original_docx = Path(self.temp_dir) / "original.docx"
+            pack_document(self.original_path, original_docx, validate=False)
+            self.original_docx = original_docx
 
     # ==================== Private: 初期化 ====================
 
+    def _comments_state(self):
+        """(版数, existing_comments, next_comment_id) を返します。
+
+        comments.xml の構造版数が前回の走査時から変わった場合のみ再走査します。
+        """
+        version = (
+            self._get_editor("word/comments.xml")._struct_version
+            if self.comments_path.exists()
+            else None
+        )
+        if self._comments_cache is None or self._comments_cache[0] != version:
+            self._comments_cache = (
+                version,
+                self._load_existing_comments(),
+                self._get_next_comment_id(),
+            )
+        return self._comments_cache
+
+    def _record_comment(self, comment_id, para_id):
+        """追加したコメントをメモ化済みのビューへ反映し、再走査を不要にします。"""
+        _, existing, next_id = self._comments_cache
+        existing[comment_id] = {"para_id": para_id}
+        version = self._get_editor("word/comments.xml")._struct_version
+        self._comments_cache = (version, existing, max(next_id, comment_id + 1))
+
+    def _preload_editors(self):
+        """word/*.xml のeditorをスレッドプールで並列に作成します。
+
+        各editorはスレッドごとのパーサで解析するため、解析同士が直列化されません。
+        """
+        xml_paths = [
+            path.relative_to(self.unpacked_path).as_posix()
+            for path in sorted(self.word_path.glob("*.xml"))
+        ]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            editors = pool.map(
+                lambda xml_path: DocxXMLEditor(
+                    self.unpacked_path / xml_path,
+                    rsid=self.rsid,
+                    author=self.author,
+                    initials=self.initials,
+                ),
+                xml_paths,
+            )
+            self._editors.update(zip(xml_paths, editors))
+
     def _get_next_comment_id(self):
         """次に利用可能なコメントIDを取得します。"""
         if not self.comments_path.exists():
             return 0
 
-        editor = self["word/comments.xml"]
-        max_id = -1
-        for comment_elem in editor.dom.getElementsByTagName("w:comment"):
-            comment_id = comment_elem.getAttribute("w:id")
-            if comment_id:
-                try:
-                    max_id = max(max_id, int(comment_id))
-                except ValueError:
-                    pass
-        return max_id + 1
+        # キャッシュ済みのw:id集合から最大の数値IDを求める（DOMを再走査しない）
+        editor = self._get_editor("word/comments.xml")
+        comment_ids = editor._attribute_values("w:comment", "w:id")
+        numeric_ids = [int(i) for i in comment_ids if _DECIMAL.fullmatch(i)]
+        return max(numeric_ids, default=-1) + 1
 
     def _load_existing_comments(self):
         """返信を可能にするため、既存コメントをファイルから読み込みます。"""
         if not self.comments_path.exists():
             return {}
 
-        editor = self["word/comments.xml"]
+        editor = self._get_editor("word/comments.xml")
         existing = {}
 
-        for comment_elem in editor.dom.getElementsByTagName("w:comment"):
-            comment_id = comment_elem.getAttribute("w:id")
+        for comment_elem in editor.dom.iter(W_COMMENT):
+            comment_id = comment_elem.get(W_ID)
             if not comment_id:
                 continue
 
             # コメント内のw:p要素からpara_idを取得
             para_id = None
-            for p_elem in comment_elem.getElementsByTagName("w:p"):
-                para_id = p_elem.getAttribute("w14:paraId")
+            for p_elem in comment_elem.iter(W_P):
+                para_id = p_elem.get(W14_PARA_ID)
                 if para_id:
                     break
 
@@ -955,26 +1154,27 @@ class Document:
 
     def _add_content_type_for_people(self, path):
         """[Content_Types].xml に people.xml のcontent typeが無ければ追加します。"""
-        editor = self["[Content_Types].xml"]
+        editor = self._get_editor("[Content_Types].xml")
 
         if self._has_override(editor, "/word/people.xml"):
             return
+        self._dirty.add("[Content_Types].xml")
 
         # Override要素を追加
-        root = editor.dom.documentElement
+        root = editor.dom.getroot()
         override_xml = '<Override PartName="/word/people.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.people+xml"/>'
         editor.append_to(root, override_xml)
 
     def _add_relationship_for_people(self, path):
         """document.xml.rels に people.xml のrelationshipが無ければ追加します。"""
-        editor = self["word/_rels/document.xml.rels"]
+        editor = self._get_editor("word/_rels/document.xml.rels")
 
         if self._has_relationship(editor, "people.xml"):
             return
+        self._dirty.add("word/_rels/document.xml.rels")
 
-        root = editor.dom.documentElement
-        root_tag = root.tagName  # type: ignore
-        prefix = root_tag.split(":")[0] + ":" if ":" in root_tag else ""
+        root = editor.dom.getroot()
+        prefix = f"{root.prefix}:" if root.prefix else ""
         next_rid = editor.get_next_rid()
 
         # relationshipエントリを作成
@@ -992,38 +1192,40 @@ class Document:
         - trackRevisions: early (before defaultTabStop)
         - rsids: late (after compat)
         """
-        editor = self["word/settings.xml"]
-        root = editor.get_node(tag="w:settings")
-        prefix = root.tagName.split(":")[0] if ":" in root.tagName else "w"
+        editor = self._get_editor("word/settings.xml")
+        version = editor._struct_version
+        root = editor.dom.getroot()
+        prefix = root.prefix or "w"
+
+        # 対象の要素はすべてsettings直下にあるため、直下の子を1回だけ走査して
+        # タグごとの最初の要素を引けるようにする
+        first_child = {}
+        for child in root:
+            first_child.setdefault(child.tag, child)
 
         # 要求されていればtrackRevisionsを追加
         if track_revisions:
-            track_revisions_exists = any(
-                elem.tagName == f"{prefix}:trackRevisions"
-                for elem in editor.dom.getElementsByTagName(f"{prefix}:trackRevisions")
-            )
-
-            if not track_revisions_exists:
+            if W_TRACK_REVISIONS not in first_child:
                 track_rev_xml = f"<{prefix}:trackRevisions/>"
                 # documentProtection/defaultTabStopの前、または先頭への挿入を試みる
                 inserted = False
-                for tag in [f"{prefix}:documentProtection", f"{prefix}:defaultTabStop"]:
-                    elements = editor.dom.getElementsByTagName(tag)
-                    if elements:
-                        editor.insert_before(elements[0], track_rev_xml)
+                for tag in [W_DOCUMENT_PROTECTION, W_DEFAULT_TAB_STOP]:
+                    anchor = first_child.get(tag)
+                    if anchor is not None:
+                        editor.insert_before(anchor, track_rev_xml)
                         inserted = True
                         break
                 if not inserted:
                     # settingsの先頭子として挿入
-                    if root.firstChild:
-                        editor.insert_before(root.firstChild, track_rev_xml)
+                    if len(root):
+                        editor.insert_before(root[0], track_rev_xml)
                     else:
                         editor.append_to(root, track_rev_xml)
 
         # rsidsセクションの有無を常にチェック
-        rsids_elements = editor.dom.getElementsByTagName(f"{prefix}:rsids")
+        rsids_elem = first_child.get(W_RSIDS)
 
-        if not rsids_elements:
+        if rsids_elem is None:
             # 新しいrsidsセクションを追加
             rsids_xml = f'''<{prefix}:rsids>
   <{prefix}:rsidRoot {prefix}:val="{self.rsid}"/>
@@ -1031,34 +1233,29 @@ class Document:
 </{prefix}:rsids>'''
 
             # compatの後、clrSchemeMappingの前、または閉じタグの前へ挿入を試みる
-            inserted = False
-            compat_elements = editor.dom.getElementsByTagName(f"{prefix}:compat")
-            if compat_elements:
-                editor.insert_after(compat_elements[0], rsids_xml)
-                inserted = True
-
-            if not inserted:
-                clr_elements = editor.dom.getElementsByTagName(
-                    f"{prefix}:clrSchemeMapping"
-                )
-                if clr_elements:
-                    editor.insert_before(clr_elements[0], rsids_xml)
-                    inserted = True
-
-            if not inserted:
+            compat_elem = first_child.get(W_COMPAT)
+            clr_elem = first_child.get(W_CLR_SCHEME_MAPPING)
+            if compat_elem is not None:
+                editor.insert_after(compat_elem, rsids_xml)
+            elif clr_elem is not None:
+                editor.insert_before(clr_elem, rsids_xml)
+            else:
                 editor.append_to(root, rsids_xml)
         else:
             # このrsidが既に存在するか確認
-            rsids_elem = rsids_elements[0]
             rsid_exists = any(
-                elem.getAttribute(f"{prefix}:val") == self.rsid
-                for elem in rsids_elem.getElementsByTagName(f"{prefix}:rsid")
+                elem.get(W_VAL) == self.rsid
+                for elem in rsids_elem.iter(W_RSID)
             )
 
             if not rsid_exists:
                 rsid_xml = f'<{prefix}:rsid {prefix}:val="{self.rsid}"/>'
                 editor.append_to(rsids_elem, rsid_xml)
 
+        # 実際に要素を追加した場合のみ、save()で書き出す対象にする
+        if editor._struct_version != version:
+            self._dirty.add("word/settings.xml")
+
     # ==================== Private: XMLファイル作成 ====================
 
     def _add_to_comments_xml(
@@ -1069,11 +1266,9 @@ class Document:
             shutil.copy(TEMPLATE_DIR / "comments.xml", self.comments_path)
 
         editor = self["word/comments.xml"]
-        root = editor.get_node(tag="w:comments")
+        root = editor.dom.getroot()
 
-        escaped_text = (
-            text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        )
+        escaped_text = text.translate(_XML_TEXT_ESCAPE)
         # 注: w:p上の w:rsidR / w:rsidRDefault / w:rsidP、w:r上の w:rsidR、
         #     および w:comment上の w:author / w:date / w:initials は DocxXMLEditor が自動付与します
         comment_xml = f'''<w:comment w:id="{comment_id}">
@@ -1092,7 +1287,7 @@ class Document:
             )
 
         editor = self["word/commentsExtended.xml"]
-        root = editor.get_node(tag="w15:commentsEx")
+        root = editor.dom.getroot()
 
         if parent_para_id:
             xml = f'<w15:commentEx w15:paraId="{para_id}" w15:paraIdParent="{parent_para_id}" w15:done="0"/>'
@@ -1106,7 +1301,7 @@ class Document:
             shutil.copy(TEMPLATE_DIR / "commentsIds.xml", self.comments_ids_path)
 
         editor = self["word/commentsIds.xml"]
-        root = editor.get_node(tag="w16cid:commentsIds")
+        root = editor.dom.getroot()
 
         xml = f'<w16cid:commentId w16cid:paraId="{para_id}" w16cid:durableId="{durable_id}"/>'
         editor.append_to(root, xml)
@@ -1119,60 +1314,48 @@ class Document:
             )
 
         editor = self["word/commentsExtensible.xml"]
-        root = editor.get_node(tag="w16cex:commentsExtensible")
+        root = editor.dom.getroot()
 
         xml = f'<w16cex:commentExtensible w16cex:durableId="{durable_id}"/>'
         editor.append_to(root, xml)
 
     # ==================== Private: XML断片 ====================
 
-    def _comment_range_start_xml(self, comment_id):
-        """comment range start のXMLを生成します。"""
-        return f'<w:commentRangeStart w:id="{comment_id}"/>'
+    def _comment_range_start_nodes(self, comment_id):
+        """comment range start の要素を生成します。"""
+        return self._document._parse_template(
+            _COMMENT_RANGE_START_XML, "w:id", comment_id
+        )
 
-    def _comment_range_end_xml(self, comment_id):
-        """参照run付きの comment range end XMLを生成します。
+    def _comment_range_end_nodes(self, comment_id):
+        """参照run付きの comment range end の要素を生成します。
 
         注: w:rsidR は DocxXMLEditor により自動付与されます。
         """
-        return f'''<w:commentRangeEnd w:id="{comment_id}"/>
-<w:r>
-  <w:rPr><w:rStyle w:val="CommentReference"/></w:rPr>
-  <w:commentReference w:id="{comment_id}"/>
-</w:r>'''
+        return self._document._parse_template(
+            _COMMENT_RANGE_END_XML, "w:id", comment_id
+        )
 
-    def _comment_ref_run_xml(self, comment_id):
-        """comment reference run のXMLを生成します。
+    def _comment_ref_run_nodes(self, comment_id):
+        """comment reference run の要素を生成します。
 
         注: w:rsidR は DocxXMLEditor により自動付与されます。
         """
-        return f'''<w:r>
-  <w:rPr><w:rStyle w:val="CommentReference"/></w:rPr>
-  <w:commentReference w:id="{comment_id}"/>
-</w:r>'''
+        return self._document._parse_template(_COMMENT_REF_RUN_XML, "w:id", comment_id)
 
     # ==================== Private: メタデータ更新 ====================
 
     def _has_relationship(self, editor, target):
         """指定targetのrelationshipが存在するか確認します。"""
-        for rel_elem in editor.dom.getElementsByTagName("Relationship"):
-            if rel_elem.getAttribute("Target") == target:
-                return True
-        return False
+        return target in editor._attribute_values("Relationship", "Target")
 
     def _has_override(self, editor, part_name):
         """指定part nameのoverrideが存在するか確認します。"""
-        for override_elem in editor.dom.getElementsByTagName("Override"):
-            if override_elem.getAttribute("PartName") == part_name:
-                return True
-        return False
+        return part_name in editor._attribute_values("Override", "PartName")
 
     def _has_author(self, editor, author):
         """people.xml にauthorが既に存在するか確認します。"""
-        for person_elem in editor.dom.getElementsByTagName("w15:person"):
-            if person_elem.getAttribute("w15:author") == author:
-                return True
-        return False
+        return author in editor._attribute_values("w15:person", "w15:author")
 
     def _add_author_to_people(self, author):
         """people.xml にauthorを追加します（初期化中に呼ばれます）。"""
@@ -1182,12 +1365,13 @@ class Document:
         if not people_path.exists():
             raise ValueError("people.xml は _setup_tracking の後に存在している必要があります")
 
-        editor = self["word/people.xml"]
-        root = editor.get_node(tag="w15:people")
+        editor = self._get_editor("word/people.xml")
+        root = editor.dom.getroot()
 
         # authorが既に存在するか確認
         if self._has_author(editor, author):
             return
+        self._dirty.add("word/people.xml")
 
         # インジェクションを防ぐため、適切にXMLエスケープしてauthorを追加
         escaped_author = html.escape(author, quote=True)
@@ -1198,14 +1382,14 @@ class Document:
 
     def _ensure_comment_relationships(self):
         """word/_rels/document.xml.rels にコメント用relationshipがあることを保証します。"""
-        editor = self["word/_rels/document.xml.rels"]
+        editor = self._get_editor("word/_rels/document.xml.rels")
 
         if self._has_relationship(editor, "comments.xml"):
             return
+        self._dirty.add("word/_rels/document.xml.rels")
 
-        root = editor.dom.documentElement
-        root_tag = root.tagName  # type: ignore
-        prefix = root_tag.split(":")[0] + ":" if ":" in root_tag else ""
+        root = editor.dom.getroot()
+        prefix = f"{root.prefix}:" if root.prefix else ""
         next_rid_num = int(editor.get_next_rid()[3:])
 
         # relationship要素を追加
@@ -1232,18 +1416,22 @@ class Document:
             ),
         ]
 
-        for rel_id, rel_type, target in rels:
-            rel_xml = f'<{prefix}Relationship Id="rId{rel_id}" Type="{rel_type}" Target="{target}"/>'
-            editor.append_to(root, rel_xml)
+        # 断片を連結し、1回のパースでまとめて追加する
+        rels_xml = "".join(
+            f'<{prefix}Relationship Id="rId{rel_id}" Type="{rel_type}" Target="{target}"/>'
+            for rel_id, rel_type, target in rels
+        )
+        editor.append_to(root, rels_xml)
 
     def _ensure_comment_content_types(self):
         """[Content_Types].xml にコメント用content typeがあることを保証します。"""
-        editor = self["[Content_Types].xml"]
+        editor = self._get_editor("[Content_Types].xml")
 
         if self._has_override(editor, "/word/comments.xml"):
             return
+        self._dirty.add("[Content_Types].xml")
 
-        root = editor.dom.documentElement
+        root = editor.dom.getroot()
 
         # Override要素を追加
         overrides = [
@@ -1265,8 +1453,9 @@ class Document:
             ),
         ]
 
-        for part_name, content_type in overrides:
-            override_xml = (
-                f'<Override PartName="{part_name}" ContentType="{content_type}"/>'
-            )
-            editor.append_to(root, override_xml)
+        # 断片を連結し、1回のパースでまとめて追加する
+        overrides_xml = "".join(
+            f'<Override PartName="{part_name}" ContentType="{content_type}"/>'
+            for part_name, content_type in overrides
+        )
+        editor.append_to(root, overrides_xml)
@@ -3,7 +3,7 @@
 OOXMLドキュメント編集用ユーティリティです。
 
 本モジュールは、XMLファイルを操作するための`XMLEditor`を提供します。
-行番号ベースのノード検索やDOM操作をサポートし、パース時に各要素へ元の行/列位置を自動で付与します。
+行番号ベースのノード検索やツリー操作をサポートします。XMLはlxmlでパースし、各要素の元の行番号（sourceline）を検索に利用します。
 
 使用例:
     editor = XMLEditor("document.xml")
@@ -29,30 +29,53 @@ OOXMLドキュメント編集用ユーティリティです。
     editor.save()
 """
 
+import copy
 import html
+import os
+import re
+import threading
 from pathlib import Path
 from typing import Optional, Union
 
-import defusedxml.minidom
-import defusedxml.sax
+import lxml.etree
+
+# 外部エンティティ/ネットワークアクセスを無効化したパーサ（defusedxml相当の安全性）
+XML_PARSER = lxml.etree.XMLParser(
+    resolve_entities=False, no_network=True, remove_blank_text=False, collect_ids=False
+)
+
+# XML_PARSERの複製をスレッドごとに持つ（lxmlは同じパーサを使うパースを直列化するため）
+_thread_parsers = threading.local()
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+# relationship Id のうち連番として扱う形式（rId1, rId2, ...）
+_RID_PATTERN = re.compile(r"rId([0-9]+)")
+
+# 文書内で最初に宣言された接頭辞 $prefix の名前空間URI（未宣言なら空文字）
+_FIND_NAMESPACE = lxml.etree.XPath("string((//namespace::*[name()=$prefix])[1])")
 
 
 class XMLEditor:
     """
     行番号ベースのノード検索に対応した、OOXMLのXMLファイル操作エディタです。
 
-    XMLをパースし、各要素の元の行/列位置を追跡します。
+    XMLをlxmlでパースし、各要素の元の行番号（sourceline）を保持します。
     これにより、元ファイル上の行番号でノードを見つけられるため、Readツールの出力と突き合わせる用途に便利です。
 
+    タグ名・属性名は "w:p" や "w:id" のような接頭辞付きの名前で指定でき、
+    ルート要素の名前空間宣言に従って解決されます（ルートに無い接頭辞は、
+    文書内の要素で局所的に宣言されたものを使います）。
+
     Attributes:
         xml_path: 編集対象XMLファイルのパス
         encoding: 検出したエンコーディング（'ascii' または 'utf-8'）
-        dom: 要素にparse_position属性が付いたパース済みDOM
+        dom: パース済みのlxml.etree._ElementTree
     """
 
     def __init__(self, xml_path):
         """
-        XMLファイルパスを受け取り、行番号追跡付きでパースして初期化します。
+        XMLファイルパスを受け取り、lxmlでパースして初期化します。
 
         引数:
             xml_path: 編集するXMLファイルのパス（strまたはPath）
@@ -68,8 +91,24 @@ class XMLEditor:
             header = f.read(200).decode("utf-8", errors="ignore")
         self.encoding = "ascii" if 'encoding="ascii"' in header else "utf-8"
 
-        parser = _create_line_tracking_parser()
-        self.dom = defusedxml.minidom.parse(str(self.xml_path), parser)
+        self.dom = lxml.etree.parse(str(self.xml_path), _get_parser())
+        # (タグ, 属性名...) → コンパイル済みXPath のキャッシュ
+        self._xpath_cache = {}
+        # 構造を変更するたびに増える版数（派生ビューのメモ化キー）
+        self._struct_version = 0
+        # 追加以外（置換・書き換え）の変更で増える版数と、追加されたノードの記録
+        self._rewrite_version = 0
+        self._inserted = []
+        # _parse_fragment のラッパーに付ける名前空間宣言（初回に組み立てて再利用）
+        self._ns_decl = None
+        # 雛形XML → パース済みの要素（_parse_template でコピーして使う）
+        self._template_cache = {}
+        # 行番号をまだ消していない追加要素（line_number検索の直前にまとめて処理）
+        self._pending_line_reset = []
+        # キー → (書き換え版数, 反映済みの追加ノード数, 親ごとの子の数, 属性値の集計結果) のキャッシュ
+        self._values_cache = {}
+        # ルート以外の要素で宣言された接頭辞 → 名前空間URI
+        self._local_prefixes = {}
 
     def get_node(
         self,
@@ -89,10 +128,10 @@ class XMLEditor:
             attrs: 一致させる属性辞書（例: {"w:id": "1"}）
             line_number: 元XMLの行番号(int)または行範囲(range)（1始まり）
             contains: 要素内のテキストノードに含まれるべき文字列。
-                      エンティティ表記（&#8220;）とUnicode文字（\u201c）の双方に対応します。
+                      エンティティ表記（&#8220;）とUnicode文字（“）の双方に対応します。
 
         戻り値:
-            defusedxml.minidom.Element: 一致したDOM要素
+            lxml.etree._Element: 一致した要素
 
         例外:
             ValueError: 見つからない、または複数一致した場合
@@ -105,14 +144,20 @@ class XMLEditor:
             elem = editor.get_node(tag="w:commentRangeStart", attrs={"w:id": "0"})
             elem = editor.get_node(tag="w:p", contains="specific text")
             elem = editor.get_node(tag="w:t", contains="&#8220;Agreement")  # エンティティ表記
-            elem = editor.get_node(tag="w:t", contains="\u201cAgreement")   # Unicode文字
+            elem = editor.get_node(tag="w:t", contains="“Agreement")   # Unicode文字
         """
+        # 検索文字列を正規化: HTMLエンティティをUnicodeへ変換（候補ごとではなく1度だけ）
+        # これにより "&#8220;Rowan" と "“Rowan" の両方で検索できます
+        normalized_contains = html.unescape(contains) if contains is not None else None
+
+        if line_number is not None:
+            self._reset_pending_line_numbers()
+
         matches = []
-        for elem in self.dom.getElementsByTagName(tag):
+        for elem in self._select(tag, attrs or {}):
             # line_numberフィルタ
             if line_number is not None:
-                parse_pos = getattr(elem, "parse_position", (None,))
-                elem_line = parse_pos[0]
+                elem_line = elem.sourceline
 
                 # 単一行番号と範囲の両方を扱う
                 if isinstance(line_number, range):
@@ -122,21 +167,9 @@ class XMLEditor:
                     if elem_line != line_number:
                         continue
 
-            # attrsフィルタ
-            if attrs is not None:
-                if not all(
-                    elem.getAttribute(attr_name) == attr_value
-                    for attr_name, attr_value in attrs.items()
-                ):
-                    continue
-
             # containsフィルタ
-            if contains is not None:
-                elem_text = self._get_element_text(elem)
-                # 検索文字列を正規化: HTMLエンティティをUnicodeへ変換
-                # これにより "&#8220;Rowan" と "“Rowan" の両方で検索できます
-                normalized_contains = html.unescape(contains)
-                if normalized_contains not in elem_text:
+            if normalized_contains is not None:
+                if normalized_contains not in self._get_element_text(elem):
                     continue
 
             # すべてのフィルタを満たしたら一致
@@ -178,48 +211,157 @@ class XMLEditor:
             )
         return matches[0]
 
+    def _select(self, tag, attrs):
+        """
+        タグ名と属性値が一致する要素を、コンパイル済みXPathで文書順に取得します。
+
+        XPathは (タグ, 属性名...) ごとに1度だけコンパイルしてキャッシュし、
+        属性値はXPath変数として渡します（属性条件が無い場合はiter()で走査します）。
+        未宣言の接頭辞を含む場合は空リストを返します。
+        """
+        if not attrs:
+            # タグのみの検索はClark表記でのiter()の方がXPath評価より速い
+            qualified = self._qualify(tag)
+            return [] if qualified is None else list(self.dom.iter(qualified))
+
+        key = (tag, *attrs)
+        xpath = self._xpath_cache.get(key)
+        if xpath is None:
+            names = [self._qualify(tag)]
+            names += [self._qualify(name, is_attribute=True) for name in attrs]
+            if None in names:
+                return []
+
+            # Clark表記の名前を、XPath用の接頭辞（n0, n1, ...）付きの名前へ変換
+            namespaces = {}
+
+            def step(qualified):
+                if not qualified.startswith("{"):
+                    return qualified
+                uri, local = qualified[1:].split("}")
+                prefix = next((p for p, u in namespaces.items() if u == uri), None)
+                if prefix is None:
+                    prefix = f"n{len(namespaces)}"
+                    namespaces[prefix] = uri
+                return f"{prefix}:{local}"
+
+            # 属性が無い場合と値が空文字の場合を同一視するため string() で比較する
+            predicates = "".join(
+                f"[string(@{step(name)})=$a{i}]" for i, name in enumerate(names[1:])
+            )
+            xpath = lxml.etree.XPath(
+                f"//{step(names[0])}{predicates}", namespaces=namespaces
+            )
+            self._xpath_cache[key] = xpath
+
+        values = {f"a{i}": value for i, value in enumerate(attrs.values())}
+        return xpath(self.dom, **values)
+
+    def _attribute_values(self, tag, attr):
+        """
+        指定タグの全要素が持つ属性値の集合を返します（存在確認をO(1)で行うため）。
+        """
+
+        def add(values, value):
+            values.add(value)
+            return values
+
+        return self._fold_attribute(("values", tag, attr), tag, attr, add, set)
+
+    def _fold_attribute(self, key, tag, attr, fold, initial):
+        """
+        指定タグの要素が持つ属性値を fold(集計値, 属性値) で集計し、キャッシュします。
+
+        insert_*/append_to による追加後は、追加ノードの値だけを集計へ反映します。
+        置換などの書き換えがあった場合や、dom を直接編集して（SubElement など）
+        対象要素の親の子の数が変わっていた場合は、全体から集計し直します。
+
+        引数:
+            key: キャッシュのキー
+            tag, attr: 対象のタグ名と属性名（"w:id" のような接頭辞付きも可）
+            fold: 集計値と属性値を受け取り、新しい集計値を返す関数
+            initial: 集計値の初期値を返す関数
+        """
+        qualified_tag = self._qualify(tag)
+        qualified_attr = self._qualify(attr, is_attribute=True)
+        if qualified_tag is None or qualified_attr is None:
+            return initial()
+
+        cached = self._values_cache.get(key)
+        if cached is not None and cached[0] != self._rewrite_version:
+            cached = None
+        if cached is not None:
+            # 追加のみの変更なら、前回以降に追加されたノードだけを走査する
+            _, seen, child_counts, result = cached
+            roots = self._inserted[seen:]
+            # 親ごとの子の数を、記録済みの追加分だけ進めた値と突き合わせる
+            child_counts = dict(child_counts)
+            for node in roots:
+                parent = node.getparent()
+                if parent in child_counts:
+                    child_counts[parent] += 1
+            if any(len(parent) != count for parent, count in child_counts.items()):
+                cached = None
+        if cached is None:
+            result = initial()
+            roots = [self.dom.getroot()]
+            child_counts = {roots[0]: len(roots[0])}
+
+        for root in roots:
+            for elem in root.iter(qualified_tag):
+                parent = elem.getparent()
+                if parent is not None and parent not in child_counts:
+                    child_counts[parent] = len(parent)
+                value = elem.get(qualified_attr)
+                if value is not None:
+                    result = fold(result, value)
+        self._values_cache[key] = (
+            self._rewrite_version,
+            len(self._inserted),
+            child_counts,
+            result,
+        )
+        return result
+
     def _get_element_text(self, elem):
         """
-        要素からテキスト内容を再帰的に抽出します。
+        要素からテキスト内容を抽出します。
 
         空白のみ（スペース/タブ/改行）のテキストノードはスキップします。
         これらは通常、ドキュメント内容ではなくXML整形を表します。
 
         引数:
-            elem: テキスト抽出対象のdefusedxml.minidom.Element
+            elem: テキスト抽出対象のlxml.etree._Element
 
         戻り値:
             str: 要素内の非空白テキストを連結した文字列
         """
-        text_parts = []
-        for node in elem.childNodes:
-            if node.nodeType == node.TEXT_NODE:
-                # 空白のみのテキストノード（XML整形）をスキップ
-                if node.data.strip():
-                    text_parts.append(node.data)
-            elif node.nodeType == node.ELEMENT_NODE:
-                text_parts.append(self._get_element_text(node))
-        return "".join(text_parts)
+        # itertext()は子孫のtext/tailを文書順に返す（コメント/処理命令の中身は含まない）
+        return "".join(text for text in elem.itertext() if text.strip())
 
     def replace_node(self, elem, new_content):
         """
         DOM要素を新しいXML内容で置換します。
 
         引数:
-            elem: 置換対象のdefusedxml.minidom.Element
+            elem: 置換対象のlxml.etree._Element
             new_content: 置換後に挿入するXML文字列
 
         戻り値:
-            List[defusedxml.minidom.Node]: 挿入されたノード一覧
+            List[lxml.etree._Element]: 挿入されたノード一覧
 
         例:
             new_nodes = editor.replace_node(old_elem, "<w:r><w:t>text</w:t></w:r>")
         """
-        parent = elem.parentNode
+        parent = elem.getparent()
         nodes = self._parse_fragment(new_content)
         for node in nodes:
-            parent.insertBefore(node, elem)
-        parent.removeChild(elem)
+            elem.addprevious(node)
+        # remove()は要素の後ろのテキスト（tail）も取り除くため、最後の挿入ノードへ引き継ぐ
+        if elem.tail:
+            nodes[-1].tail = (nodes[-1].tail or "") + elem.tail
+        parent.remove(elem)
+        self._mark_rewritten()
         return nodes
 
     def insert_after(self, elem, xml_content):
@@ -227,23 +369,21 @@ class XMLEditor:
         DOM要素の後ろにXML内容を挿入します。
 
         引数:
-            elem: 挿入基準となるdefusedxml.minidom.Element
+            elem: 挿入基準となるlxml.etree._Element
             xml_content: 挿入するXML文字列
 
         戻り値:
-            List[defusedxml.minidom.Node]: 挿入されたノード一覧
+            List[lxml.etree._Element]: 挿入されたノード一覧
 
         例:
             new_nodes = editor.insert_after(elem, "<w:r><w:t>text</w:t></w:r>")
         """
-        parent = elem.parentNode
-        next_sibling = elem.nextSibling
         nodes = self._parse_fragment(xml_content)
+        anchor = elem
         for node in nodes:
-            if next_sibling:
-                parent.insertBefore(node, next_sibling)
-            else:
-                parent.appendChild(node)
+            anchor.addnext(node)
+            anchor = node
+        self._mark_inserted(nodes)
         return nodes
 
     def insert_before(self, elem, xml_content):
@@ -251,19 +391,19 @@ class XMLEditor:
         DOM要素の前にXML内容を挿入します。
 
         引数:
-            elem: 挿入基準となるdefusedxml.minidom.Element
+            elem: 挿入基準となるlxml.etree._Element
             xml_content: 挿入するXML文字列
 
         戻り値:
-            List[defusedxml.minidom.Node]: 挿入されたノード一覧
+            List[lxml.etree._Element]: 挿入されたノード一覧
 
         例:
             new_nodes = editor.insert_before(elem, "<w:r><w:t>text</w:t></w:r>")
         """
-        parent = elem.parentNode
         nodes = self._parse_fragment(xml_content)
         for node in nodes:
-            parent.insertBefore(node, elem)
+            elem.addprevious(node)
+        self._mark_inserted(nodes)
         return nodes
 
     def append_to(self, elem, xml_content):
@@ -271,102 +411,198 @@ class XMLEditor:
         Append XML content as a child of a DOM element.
 
         引数:
-            elem: defusedxml.minidom.Element to append to
+            elem: lxml.etree._Element to append to
             xml_content: String containing XML to append
 
         戻り値:
-            List[defusedxml.minidom.Node]: All inserted nodes
+            List[lxml.etree._Element]: All inserted nodes
 
         例:
             new_nodes = editor.append_to(elem, "<w:r><w:t>text</w:t></w:r>")
         """
         nodes = self._parse_fragment(xml_content)
         for node in nodes:
-            elem.appendChild(node)
+            elem.append(node)
+        self._mark_inserted(nodes)
         return nodes
 
+    def insert_element_after(self, elem, new_elem):
+        """
+        構築済みの要素を、XML文字列を介さずにそのままDOM要素の後ろへ挿入します。
+
+        引数:
+            elem: 挿入基準となるlxml.etree._Element
+            new_elem: 挿入するlxml.etree._Element
+
+        戻り値:
+            List[lxml.etree._Element]: 挿入されたノード一覧（[new_elem]）
+
+        例:
+            new_nodes = editor.insert_element_after(elem, copy.deepcopy(other))
+        """
+        self._pending_line_reset.append(new_elem)
+        elem.addnext(new_elem)
+        self._mark_inserted([new_elem])
+        return [new_elem]
+
     def get_next_rid(self):
         """relationshipsファイルで次に利用可能なrIdを取得します。"""
-        max_id = 0
-        for rel_elem in self.dom.getElementsByTagName("Relationship"):
-            rel_id = rel_elem.getAttribute("Id")
-            if rel_id.startswith("rId"):
-                try:
-                    max_id = max(max_id, int(rel_id[3:]))
-                except ValueError:
-                    pass
+
+        def fold(max_id, rel_id):
+            # "rId<数字>" 形式のものだけを数値として比較する
+            match = _RID_PATTERN.fullmatch(rel_id)
+            return max(max_id, int(match.group(1))) if match else max_id
+
+        # 最大値を保持し、relationshipの追加後は追加分だけを反映する（全体を再走査しない）
+        max_id = self._fold_attribute(("max_rid",), "Relationship", "Id", fold, int)
         return f"rId{max_id + 1}"
 
+    def _reset_pending_line_numbers(self):
+        """追加済み要素の行番号を消し、line_number検索の対象外にします。"""
+        for elem in self._pending_line_reset:
+            _clear_line_numbers(elem)
+        self._pending_line_reset.clear()
+
+    def _mark_inserted(self, nodes):
+        """ノードの追加を記録し、構造の版数を進めます。"""
+        self._inserted.extend(nodes)
+        self._struct_version += 1
+
+    def _mark_rewritten(self):
+        """置換・書き換えを記録し、構造の版数を進めます（派生キャッシュは作り直し）。"""
+        self._rewrite_version += 1
+        self._struct_version += 1
+
     def save(self):
         """
         Save the edited XML back to the file.
 
-        Serializes the DOM tree and writes it back to the original file path,
-        preserving the original encoding (ascii or utf-8).
+        Serializes the tree and writes it back to the original file path,
+        preserving the original encoding (ascii or utf-8) and standalone flag.
+        The tree is written to a sibling temp file and swapped in with
+        os.replace(), so the file is never left partially written.
+        Serialization streams straight to disk via lxml.etree.xmlfile instead
+        of materializing the whole document as a string first.
+        """
+        tmp_path = self.xml_path.with_name(self.xml_path.name + ".tmp")
+        root = self.dom.getroot()
+        with lxml.etree.xmlfile(str(tmp_path), encoding=self.encoding) as xf:
+            xf.write_declaration(standalone=self.dom.docinfo.standalone)
+            # ルート要素の前後にある処理命令やコメントも保持する
+            for node in reversed(list(root.itersiblings(preceding=True))):
+                xf.write(node)
+            xf.write(root)
+            for node in root.itersiblings():
+                xf.write(node)
+        os.replace(tmp_path, self.xml_path)
+
+    def _qualify(self, name, is_attribute=False):
+        """
+        "w:p" のような接頭辞付きの名前を、lxmlのClark表記（{uri}p）へ変換します。
+
+        接頭辞なしのタグ名はルートの既定名前空間に属するものとして扱います
+        （属性名は名前空間なしのまま）。ルートで宣言されていない接頭辞（a:blip の a など）は
+        文書内で局所的に宣言されたものから解決し、どこにも無い場合はNoneを返します。
         """
-        content = self.dom.toxml(encoding=self.encoding)
-        self.xml_path.write_bytes(content)
+        prefix, sep, local = name.rpartition(":")
+        if not sep:
+            if is_attribute:
+                return local
+            default_ns = self.dom.getroot().nsmap.get(None)
+            return f"{{{default_ns}}}{local}" if default_ns else local
+        if prefix == "xml":
+            return f"{{{XML_NAMESPACE}}}{local}"
+        uri = self.dom.getroot().nsmap.get(prefix) or self._local_namespace(prefix)
+        return f"{{{uri}}}{local}" if uri else None
+
+    def _local_namespace(self, prefix):
+        """ルート以外の要素で宣言された接頭辞の名前空間URIを返します（無ければNone）。"""
+        uri = self._local_prefixes.get(prefix)
+        if uri is None:
+            # 見つからなかった結果は、後から追加される宣言に備えてキャッシュしない
+            uri = _FIND_NAMESPACE(self.dom, prefix=prefix) or None
+            if uri is not None:
+                self._local_prefixes[prefix] = uri
+        return uri
 
     def _parse_fragment(self, xml_content):
         """
-        Parse XML fragment and return list of imported nodes.
+        Parse XML fragment and return list of parsed nodes.
+
+        The fragment is wrapped in a root element carrying this document's
+        namespace declarations, so prefixed tags resolve against the document.
+        Redundant declarations are dropped by lxml once the nodes are inserted.
 
         引数:
-            xml_content: String containing XML fragment
+            xml_content: String containing XML fragment, or a list of
+                already-built elements (e.g. from _parse_template), which
+                is returned as-is
 
         戻り値:
-            List of defusedxml.minidom.Node objects imported into this document
+            List of lxml.etree._Element objects (not yet attached to this document)
 
         例外:
             AssertionError: If fragment contains no element nodes
         """
-        # ルート要素から名前空間宣言を抽出
-        root_elem = self.dom.documentElement
-        namespaces = []
-        if root_elem and root_elem.attributes:
-            for i in range(root_elem.attributes.length):
-                attr = root_elem.attributes.item(i)
-                if attr.name.startswith("xmlns"):  # type: ignore
-                    namespaces.append(f'{attr.name}="{attr.value}"')  # type: ignore
-
-        ns_decl = " ".join(namespaces)
-        wrapper = f"<root {ns_decl}>{xml_content}</root>"
-        fragment_doc = defusedxml.minidom.parseString(wrapper)
-        nodes = [
-            self.dom.importNode(child, deep=True)
-            for child in fragment_doc.documentElement.childNodes  # type: ignore
-        ]
-        elements = [n for n in nodes if n.nodeType == n.ELEMENT_NODE]
+        if not isinstance(xml_content, str):
+            return list(xml_content)
+
+        # ルート要素の名前空間宣言は初回のみ組み立て、以降は再利用する
+        if self._ns_decl is None:
+            self._ns_decl = " ".join(
+                f'{f"xmlns:{prefix}" if prefix else "xmlns"}="{uri}"'
+                for prefix, uri in self.dom.getroot().nsmap.items()
+            )
+        wrapper = f"<root {self._ns_decl}>{xml_content}</root>"
+        fragment_root = lxml.etree.fromstring(wrapper, _get_parser())
+        nodes = list(fragment_root)
+        elements = [n for n in nodes if isinstance(n.tag, str)]
         assert elements, "Fragment must contain at least one element"
+        # 行番号の消去はline_number検索が行われるまで遅延する
+        self._pending_line_reset.extend(elements)
         return nodes
 
+    def _parse_template(self, template, attr, value):
+        """
+        属性値だけが異なる定型の断片を、パース済みの雛形をコピーして作ります。
 
-def _create_line_tracking_parser():
-    """
-    Create a SAX parser that tracks line and column numbers for each element.
+        雛形は "{value}" を含むXML文字列で、初回のみパースしてキャッシュします。
+        コピーした要素のうち属性 attr を持つものに value を設定して返すため、
+        insert_*/append_to/replace_node へXML文字列の代わりに渡せます。
 
-    Monkey patches the SAX content handler to store the current line and column
-    position from the underlying expat parser onto each element as a parse_position
-    attribute (line, column) tuple.
+        例:
+            nodes = editor._parse_template('<w:commentRangeStart w:id="{value}"/>', "w:id", 3)
+            editor.insert_before(elem, nodes)
+        """
+        prototypes = self._template_cache.get(template)
+        if prototypes is None:
+            prototypes = self._parse_fragment(template.format(value=""))
+            self._template_cache[template] = prototypes
+
+        qualified = self._qualify(attr, is_attribute=True)
+        value = str(value)
+        nodes = [copy.deepcopy(node) for node in prototypes]
+        for node in nodes:
+            for elem in node.iter():
+                if qualified in elem.attrib:
+                    elem.set(qualified, value)
+        self._pending_line_reset.extend(nodes)
+        return nodes
 
-    戻り値:
-        defusedxml.sax.xmlreader.XMLReader: Configured SAX parser
-    """
 
-    def set_content_handler(dom_handler):
-        def startElementNS(name, tagName, attrs):
-            orig_start_cb(name, tagName, attrs)
-            cur_elem = dom_handler.elementStack[-1]
-            cur_elem.parse_position = (
-                parser._parser.CurrentLineNumber,  # type: ignore
-                parser._parser.CurrentColumnNumber,  # type: ignore
-            )
+def _get_parser():
+    """現在のスレッド用の、XML_PARSERと同じ設定のパーサを返します。"""
+    parser = getattr(_thread_parsers, "parser", None)
+    if parser is None:
+        parser = _thread_parsers.parser = XML_PARSER.copy()
+    return parser
 
-        orig_start_cb = dom_handler.startElementNS
-        dom_handler.startElementNS = startElementNS
-        orig_set_content_handler(dom_handler)
 
-    parser = defusedxml.sax.make_parser()
-    orig_set_content_handler = parser.setContentHandler
-    parser.setContentHandler = set_content_handler  # type: ignore
-    return parser
+def _clear_line_numbers(elem):
+    """
+    後から追加した要素の行番号を消し、line_number検索の対象外にします。
+
+    断片のパースやdeepcopyで得た要素の行番号は元ファイルの行を指さないためです。
+    """
+    for child in elem.iter():
+        child.sourceline = 0
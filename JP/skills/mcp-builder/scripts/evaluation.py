@@ -11,13 +11,19 @@ import sys
 import time
 import traceback
 import xml.etree.ElementTree as ET
+from collections import defaultdict
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from anthropic import Anthropic
 
 from connections import create_connection
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 EVALUATION_PROMPT = """あなたはツールにアクセスできるAIアシスタントです。
 
 タスクが与えられたら、必ず以下を行ってください:
@@ -52,15 +58,26 @@ EVALUATION_PROMPT = """あなたはツールにアクセスできるAIアシス
 - 名前/テキストは要求された文字列をそのまま返してください
 - <response> は最後に置いてください"""
 
+# ツール結果1件あたりの最大文字数（超過分は切り詰めて会話履歴の肥大化を防ぐ）
+MAX_TOOL_RESPONSE_CHARS = 8192
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+# システムプロンプトは全呼び出しで共通なので、キャッシュブレークポイント付きで一度だけ組み立てる
+_CACHED_SYSTEM = [{"type": "text", "text": EVALUATION_PROMPT, "cache_control": _EPHEMERAL}]
+
 
 def parse_evaluation_file(file_path: Path) -> list[dict[str, Any]]:
     """qa_pair要素を含むXML評価ファイルをパースします。"""
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
         evaluations = []
+        # DOM全体を構築せず、qa_pairが閉じるたびに取り出して処理済みの要素を解放する
+        context = ET.iterparse(file_path, events=("start", "end"))
+        _, root = next(context)
 
-        for qa_pair in root.findall(".//qa_pair"):
+        for event, qa_pair in context:
+            if event != "end" or qa_pair.tag != "qa_pair":
+                continue
             question_elem = qa_pair.find("question")
             answer_elem = qa_pair.find("answer")
 
@@ -69,6 +86,7 @@ def parse_evaluation_file(file_path: Path) -> list[dict[str, Any]]:
                     "question": (question_elem.text or "").strip(),
                     "answer": (answer_elem.text or "").strip(),
                 })
+            root.clear()
 
         return evaluations
     except Exception as e:
@@ -76,13 +94,99 @@ def parse_evaluation_file(file_path: Path) -> list[dict[str, Any]]:
         return []
 
 
+# タグごとにコンパイル済みの正規表現（response / summary / feedback がタスクごとに繰り返し使われる）
+_XML_TAG_PATTERNS: dict[str, re.Pattern[str]] = {}
+
+
 def extract_xml_content(text: str, tag: str) -> str | None:
     """XMLタグから内容を抽出します。"""
-    pattern = rf"<{tag}>(.*?)</{tag}>"
-    matches = re.findall(pattern, text, re.DOTALL)
+    pattern = _XML_TAG_PATTERNS.get(tag)
+    if pattern is None:
+        pattern = _XML_TAG_PATTERNS[tag] = re.compile(rf"<{tag}>(.*?)</{tag}>", re.DOTALL)
+    matches = pattern.findall(text)
     return matches[-1].strip() if matches else None
 
 
+def _with_cache_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """最後のターンの末尾ブロックにキャッシュブレークポイントを付けたメッセージ列を返します。
+
+    ブレークポイントは常に最新のターンにだけ置き、蓄積した履歴は元の messages を変更せずに再利用します。
+    """
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    content = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL}]
+    return [*messages[:-1], {**last, "content": content}]
+
+
+async def _create_message(
+    client: Anthropic,
+    model: str,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]],
+) -> Any:
+    """プロンプトキャッシュを有効にしてClaude APIを呼び出します。"""
+    return await asyncio.to_thread(
+        client.messages.create,
+        model=model,
+        max_tokens=4096,
+        system=_CACHED_SYSTEM,
+        messages=_with_cache_breakpoint(messages),
+        tools=tools,
+    )
+
+
+def _with_tool_cache_breakpoint(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """最後のツール定義にキャッシュブレークポイントを付けたツール一覧を返します。
+
+    tools → system → messages の順にキャッシュされるため、ツール定義全体が1つのプレフィックスになります。
+    """
+    return [*tools[:-1], {**tools[-1], "cache_control": _EPHEMERAL}] if tools else tools
+
+
+def _truncate_tool_response(tool_response: str) -> str:
+    """会話履歴は毎回送り直されるため、ツール結果をMAX_TOOL_RESPONSE_CHARS文字までに切り詰めます。"""
+    if len(tool_response) <= MAX_TOOL_RESPONSE_CHARS:
+        return tool_response
+    omitted = len(tool_response) - MAX_TOOL_RESPONSE_CHARS
+    return f"{tool_response[:MAX_TOOL_RESPONSE_CHARS]}...[truncated {omitted} chars]"
+
+
+async def _call_tool(connection: Any, tool_use: Any) -> tuple[str, float, str | None]:
+    """tool_useブロック1つを実行し、結果文字列・所要時間・エラー行（成功時はNone）を返します。"""
+    tool_start_ts = time.perf_counter()
+    error = None
+    try:
+        tool_result = await connection.call_tool(tool_use.name, tool_use.input)
+    except Exception as e:
+        error = f"ツール実行エラー {tool_use.name}: {str(e)}"
+        tool_response = error + "\n" + traceback.format_exc()
+    else:
+        # 直列化の失敗はツールの失敗ではないため、上のtryの外で行う
+        tool_response = _serialize_tool_result(tool_result)
+    return _truncate_tool_response(tool_response), time.perf_counter() - tool_start_ts, error
+
+
+def _serialize_tool_result(tool_result: Any) -> str:
+    """ツール結果を文字列にします（dict/listはJSON、それ以外はstr()）。
+
+    非文字列キーはjson.dumpsと同様に文字列化します。orjsonで直列化できない値はjson.dumpsで、
+    それも失敗した場合はstr()で文字列にします。
+    """
+    if not isinstance(tool_result, (dict, list)):
+        return str(tool_result)
+    if orjson:
+        try:
+            return orjson.dumps(tool_result, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    try:
+        return json.dumps(tool_result)
+    except (TypeError, ValueError):
+        return str(tool_result)
+
+
 async def agent_loop(
     client: Anthropic,
     model: str,
@@ -93,55 +197,39 @@ async def agent_loop(
     """MCPツールを使ってエージェントループを実行します。"""
     messages = [{"role": "user", "content": question}]
 
-    response = await asyncio.to_thread(
-        client.messages.create,
-        model=model,
-        max_tokens=4096,
-        system=EVALUATION_PROMPT,
-        messages=messages,
-        tools=tools,
-    )
+    response = await _create_message(client, model, messages, tools)
 
     messages.append({"role": "assistant", "content": response.content})
 
-    tool_metrics = {}
+    tool_metrics = defaultdict(lambda: {"count": 0, "durations": []})
+    previous_errors = set()
 
     while response.stop_reason == "tool_use":
-        tool_use = next(block for block in response.content if block.type == "tool_use")
-        tool_name = tool_use.name
-        tool_input = tool_use.input
-
-        tool_start_ts = time.time()
-        try:
-            tool_result = await connection.call_tool(tool_name, tool_input)
-            tool_response = json.dumps(tool_result) if isinstance(tool_result, (dict, list)) else str(tool_result)
-        except Exception as e:
-            tool_response = f"ツール実行エラー {tool_name}: {str(e)}\n"
-            tool_response += traceback.format_exc()
-        tool_duration = time.time() - tool_start_ts
-
-        if tool_name not in tool_metrics:
-            tool_metrics[tool_name] = {"count": 0, "durations": []}
-        tool_metrics[tool_name]["count"] += 1
-        tool_metrics[tool_name]["durations"].append(tool_duration)
-
-        messages.append({
-            "role": "user",
-            "content": [{
+        tool_uses = [block for block in response.content if block.type == "tool_use"]
+        # 同一ターン内のツール呼び出しは互いに独立しているので、MCPへの往復を重ねて実行する
+        outcomes = await asyncio.gather(*(_call_tool(connection, tool_use) for tool_use in tool_uses))
+
+        tool_results = []
+        for tool_use, (tool_response, tool_duration, _) in zip(tool_uses, outcomes):
+            metrics = tool_metrics[tool_use.name]
+            metrics["count"] += 1
+            metrics["durations"].append(tool_duration)
+            tool_results.append({
                 "type": "tool_result",
                 "tool_use_id": tool_use.id,
                 "content": tool_response,
-            }]
-        })
-
-        response = await asyncio.to_thread(
-            client.messages.create,
-            model=model,
-            max_tokens=4096,
-            system=EVALUATION_PROMPT,
-            messages=messages,
-            tools=tools,
-        )
+            })
+
+        # 同じツールが同じエラーで2ターン続けて失敗したらループとみなし、履歴を膨らませる前に打ち切る
+        errors = {error for _, _, error in outcomes if error}
+        if repeated := errors & previous_errors:
+            summary = f"同じツールエラーが連続したため打ち切りました: {min(repeated)}"
+            return f"<summary>{summary}</summary>\n<response>NOT_FOUND</response>", tool_metrics
+        previous_errors = errors
+
+        messages.append({"role": "user", "content": tool_results})
+
+        response = await _create_message(client, model, messages, tools)
         messages.append({"role": "assistant", "content": response.content})
 
     response_text = next(
@@ -160,7 +248,7 @@ async def evaluate_single_task(
     task_index: int,
 ) -> dict[str, Any]:
     """指定ツール群で1つのQAペアを評価します。"""
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     print(f"タスク{task_index + 1}: 質問を実行します: {qa_pair['question']}")
     response, tool_metrics = await agent_loop(client, model, qa_pair["question"], tools, connection)
@@ -169,7 +257,7 @@ async def evaluate_single_task(
     summary = extract_xml_content(response, "summary")
     feedback = extract_xml_content(response, "feedback")
 
-    duration_seconds = time.time() - start_time
+    duration_seconds = time.perf_counter() - start_time
 
     return {
         "question": qa_pair["question"],
@@ -178,7 +266,7 @@ async def evaluate_single_task(
         "score": int(response_value == qa_pair["answer"]) if response_value else 0,
         "total_duration": duration_seconds,
         "tool_calls": tool_metrics,
-        "num_tool_calls": sum(len(metrics["durations"]) for metrics in tool_metrics.values()),
+        "num_tool_calls": sum(metrics["count"] for metrics in tool_metrics.values()),
         "summary": summary,
         "feedback": feedback,
     }
@@ -221,31 +309,50 @@ async def run_evaluation(
     eval_path: Path,
     connection: Any,
     model: str = "claude-3-7-sonnet-20250219",
-) -> str:
-    """MCPサーバーのツール群で評価を実行します。"""
+    max_concurrency: int = 8,
+) -> Iterator[str]:
+    """MCPサーバーのツール群で評価を実行します。
+
+    タスク同士は独立しているため、最大 max_concurrency 件を並行して評価します。
+    MCPのClientSessionはリクエストIDで応答を振り分けるので、1つの接続を共有できます。
+    """
     print("🚀 評価を開始します")
 
     client = Anthropic()
 
     tools = await connection.list_tools()
     print(f"📋 MCPサーバーからツールを{len(tools)}個読み込みました")
+    # 全タスク・全ターンで同じオブジェクトを使い回すため、ブレークポイントの付与はここで一度だけ行う
+    tools = _with_tool_cache_breakpoint(tools)
 
     qa_pairs = parse_evaluation_file(eval_path)
     print(f"📋 評価タスクを{len(qa_pairs)}件読み込みました")
 
-    results = []
-    for i, qa_pair in enumerate(qa_pairs):
-        print(f"タスク処理中 {i + 1}/{len(qa_pairs)}")
-        result = await evaluate_single_task(client, model, qa_pair, tools, connection, i)
-        results.append(result)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_task(i: int, qa_pair: dict[str, Any]) -> dict[str, Any]:
+        async with semaphore:
+            print(f"タスク処理中 {i + 1}/{len(qa_pairs)}")
+            return await evaluate_single_task(client, model, qa_pair, tools, connection, i)
+
+    # gatherは引数の順序で結果を返すので、完了順に関わらずレポートはタスク順になる
+    results = await asyncio.gather(*(run_task(i, qa_pair) for i, qa_pair in enumerate(qa_pairs)))
 
+    return _iter_report(qa_pairs, results)
+
+
+def _iter_report(qa_pairs: list[dict[str, Any]], results: list[dict[str, Any]]) -> Iterator[str]:
+    """評価レポートをヘッダー、タスクごとの順に文字列片として返します。
+
+    全体を1つの文字列に連結せず、呼び出し側でそのままファイルや標準出力に書き出せます。
+    """
     correct = sum(r["score"] for r in results)
     accuracy = (correct / len(results)) * 100 if results else 0
     average_duration_s = sum(r["total_duration"] for r in results) / len(results) if results else 0
     average_tool_calls = sum(r["num_tool_calls"] for r in results) / len(results) if results else 0
     total_tool_calls = sum(r["num_tool_calls"] for r in results)
 
-    report = REPORT_HEADER.format(
+    yield REPORT_HEADER.format(
         correct=correct,
         total=len(results),
         accuracy=accuracy,
@@ -254,8 +361,8 @@ async def run_evaluation(
         total_tool_calls=total_tool_calls,
     )
 
-    report += "".join([
-        TASK_TEMPLATE.format(
+    for i, (qa_pair, result) in enumerate(zip(qa_pairs, results)):
+        yield TASK_TEMPLATE.format(
             task_num=i + 1,
             question=qa_pair["question"],
             expected_answer=qa_pair["answer"],
@@ -266,10 +373,6 @@ async def run_evaluation(
             summary=result["summary"] or "N/A",
             feedback=result["feedback"] or "N/A",
         )
-        for i, (qa_pair, result) in enumerate(zip(qa_pairs, results))
-    ])
-
-    return report
 
 
 def parse_headers(header_list: list[str]) -> dict[str, str]:
@@ -332,10 +435,15 @@ async def main():
     remote_group.add_argument("-u", "--url", help="MCPサーバーURL（sse/httpのみ）")
     remote_group.add_argument("-H", "--header", nargs="+", dest="headers", help="HTTPヘッダー（'Key: Value'形式、sse/httpのみ）")
 
+    parser.add_argument("-j", "--concurrency", type=int, default=8, help="同時に評価するタスク数の上限（デフォルト: 8）")
     parser.add_argument("-o", "--output", type=Path, help="評価レポートの出力先（デフォルト: stdout）")
 
     args = parser.parse_args()
 
+    if args.concurrency < 1:
+        print("エラー: --concurrency には1以上を指定してください")
+        sys.exit(1)
+
     if not args.eval_file.exists():
         print(f"エラー: 評価ファイルが見つかりません: {args.eval_file}")
         sys.exit(1)
@@ -360,13 +468,16 @@ async def main():
 
     async with connection:
         print("✅ 接続しました")
-        report = await run_evaluation(args.eval_file, connection, args.model)
+        report = await run_evaluation(args.eval_file, connection, args.model, args.concurrency)
 
         if args.output:
-            args.output.write_text(report)
+            with args.output.open("w") as f:
+                f.writelines(report)
             print(f"\n✅ レポートを保存しました: {args.output}")
         else:
-            print("\n" + report)
+            print()
+            sys.stdout.writelines(report)
+            print()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,22 @@
+from collections import defaultdict
 from dataclasses import dataclass
+import heapq
+import itertools
 import json
 import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # ClaudeがPDF解析時に作成する`fields.json`について、
 # バウンディングボックスが重なっていないことをチェックするスクリプトです。forms.mdを参照。
 
+# 出力するメッセージの上限（先頭の "Read N fields" を含む）。超えたらチェックを中断する
+MAX_MESSAGES = 20
+
 
 @dataclass
 class RectAndField:
@@ -14,36 +25,73 @@ class RectAndField:
     field: dict
 
 
+def rects_intersect(r1, r2):
+    disjoint_horizontal = r1[0] >= r2[2] or r1[2] <= r2[0]
+    disjoint_vertical = r1[1] >= r2[3] or r1[3] <= r2[1]
+    return not (disjoint_horizontal or disjoint_vertical)
+
+
+# 同一ページ上で交差する矩形の組 (i, j) を、見つかった順に1組ずつ生成します。
+# ページごとに左端xでソートしてスイープし、右端xがまだ現在の左端より右にある矩形（ヒープで管理）とだけ比較します。
+def iter_intersections(rects_and_fields):
+    pages = defaultdict(list)
+    for idx, rf in enumerate(rects_and_fields):
+        pages[rf.field["page_number"]].append(idx)
+
+    for indices in pages.values():
+        indices.sort(key=lambda idx: rects_and_fields[idx].rect[0])
+        active = []
+        for idx in indices:
+            rect = rects_and_fields[idx].rect
+            while active and active[0][0] <= rect[0]:
+                heapq.heappop(active)
+            for _, other in active:
+                if rects_intersect(rects_and_fields[other].rect, rect):
+                    yield min(idx, other), max(idx, other)
+            heapq.heappush(active, (rect[2], idx))
+
+
+# 交差する矩形の組を、添字iごとに相手j（i < j、昇順）のリストとして返します。
+# limitを指定すると、組がその数に達した時点で探索を打ち切ります（ほとんどの矩形が重なる入力でも
+# O(N^2)個の組を集めないため）。その場合に返る組は、見つかった順の一部です。
+def find_intersections(rects_and_fields, limit=None) -> dict[int, list[int]]:
+    partners = defaultdict(list)
+    for i, j in itertools.islice(iter_intersections(rects_and_fields), limit):
+        partners[i].append(j)
+
+    for js in partners.values():
+        js.sort()
+    return partners
+
+
 # Claudeが読み取れるようにstdoutへ出力するメッセージのリストを返します。
 def get_bounding_box_messages(fields_json_stream) -> list[str]:
     messages = []
-    fields = json.load(fields_json_stream)
+    # orjsonがあれば使い、大きなfields.jsonのパースを速くする
+    fields = orjson.loads(fields_json_stream.read()) if orjson else json.load(fields_json_stream)
     messages.append(f"Read {len(fields['form_fields'])} fields")
 
-    def rects_intersect(r1, r2):
-        disjoint_horizontal = r1[0] >= r2[2] or r1[2] <= r2[0]
-        disjoint_vertical = r1[1] >= r2[3] or r1[3] <= r2[1]
-        return not (disjoint_horizontal or disjoint_vertical)
-
     rects_and_fields = []
     for f in fields["form_fields"]:
         rects_and_fields.append(RectAndField(f["label_bounding_box"], "label", f))
         rects_and_fields.append(RectAndField(f["entry_bounding_box"], "entry", f))
 
+    # 失敗メッセージは先頭の1件を除いて最大 MAX_MESSAGES - 1 件なので、それ以上の組は探さない
+    intersections = find_intersections(rects_and_fields, limit=MAX_MESSAGES - 1)
+
     has_error = False
     for i, ri in enumerate(rects_and_fields):
-        # 計算量はO(N^2)。問題になる場合は最適化できます。
-        for j in range(i + 1, len(rects_and_fields)):
+        # 交差の組は元の順序で出力します（打ち切った場合、報告される組は総当たりのときと異なり得る）。
+        for j in intersections.get(i, ()):
             rj = rects_and_fields[j]
-            if ri.field["page_number"] == rj.field["page_number"] and rects_intersect(ri.rect, rj.rect):
-                has_error = True
-                if ri.field is rj.field:
-                    messages.append(f"FAILURE: intersection between label and entry bounding boxes for `{ri.field['description']}` ({ri.rect}, {rj.rect})")
-                else:
-                    messages.append(f"FAILURE: intersection between {ri.rect_type} bounding box for `{ri.field['description']}` ({ri.rect}) and {rj.rect_type} bounding box for `{rj.field['description']}` ({rj.rect})")
-                if len(messages) >= 20:
-                    messages.append("以降のチェックを中断します。バウンディングボックスを修正して再実行してください。")
-                    return messages
+            has_error = True
+            if ri.field is rj.field:
+                messages.append(f"FAILURE: intersection between label and entry bounding boxes for `{ri.field['description']}` ({ri.rect}, {rj.rect})")
+            else:
+                messages.append(f"FAILURE: intersection between {ri.rect_type} bounding box for `{ri.field['description']}` ({ri.rect}) and {rj.rect_type} bounding box for `{rj.field['description']}` ({rj.rect})")
+            if len(messages) >= MAX_MESSAGES:
+                messages.append("以降のチェックを中断します。バウンディングボックスを修正して再実行してください。")
+                return messages
         if ri.rect_type == "entry":
             if "entry_text" in ri.field:
                 font_size = ri.field["entry_text"].get("font_size", 14)
@@ -55,7 +103,7 @@ def get_bounding_box_messages(fields_json_stream) -> list[str]:
                         f"テキスト内容に対して不足しています（フォントサイズ: {font_size}）。"
                         "ボックスの高さを増やすか、フォントサイズを下げてください。"
                     )
-                    if len(messages) >= 20:
+                    if len(messages) >= MAX_MESSAGES:
                         messages.append("以降のチェックを中断します。バウンディングボックスを修正して再実行してください。")
                         return messages
 
@@ -5,8 +5,22 @@ from pypdf import PdfReader
 # PDFに入力可能なフォームフィールドがあるかどうかを判定するためにClaudeが実行するスクリプト。forms.mdを参照。
 
 
-reader = PdfReader(sys.argv[1])
-if (reader.get_fields()):
-    print("This PDF has fillable form fields")
-else:
-    print("This PDF does not have fillable form fields; you will need to visually determine where to enter data")
+def has_fillable_fields(pdf_path) -> bool:
+    # get_fields()はフィールドツリー全体を解決するので、AcroFormの/Fields配列が空でないかだけを見る
+    reader = PdfReader(pdf_path)
+    acro_form = reader.trailer["/Root"].get("/AcroForm")
+    if acro_form is None:
+        return False
+    # /Fieldsは間接参照のこともある（IndirectObjectは常に真になるため、解決してから判定する）
+    fields = acro_form.get_object().get("/Fields")
+    return fields is not None and bool(fields.get_object())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("使い方: check_fillable_fields.py [入力PDF]")
+        sys.exit(1)
+    if has_fillable_fields(sys.argv[1]):
+        print("This PDF has fillable form fields")
+    else:
+        print("This PDF does not have fillable form fields; you will need to visually determine where to enter data")
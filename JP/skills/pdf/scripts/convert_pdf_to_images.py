@@ -1,29 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 
 from pdf2image import convert_from_path
+from pypdf import PdfReader
 
 
 # PDFの各ページをPNG画像に変換します。
 
 
+def convert_page(pdf_path, page_number, page_size_pts, image_path, max_dim):
+    # 長辺が`max_dim`以下になる解像度で最初からラスタライズし、捨てるだけのピクセルを描画しない
+    dpi = min(200, max_dim * 72 / page_size_pts)
+    # 1ページずつラスタライズし、保存したら手放すので、同時に保持する画像はワーカー数分だけで済む
+    [image] = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+
+    # pdftoppmの丸めで`max_dim`をわずかに超えることがあるため、縮小処理は安全策として残す
+    width, height = image.size
+    if width > max_dim or height > max_dim:
+        scale_factor = min(max_dim / width, max_dim / height)
+        new_width = int(width * scale_factor)
+        new_height = int(height * scale_factor)
+        image = image.resize((new_width, new_height))
+
+    # 確認用の画像なので、ファイルサイズよりPNGエンコードの速さを優先する
+    image.save(image_path, optimize=False, compress_level=1)
+    return image.size
+
+
 def convert(pdf_path, output_dir, max_dim=1000):
-    images = convert_from_path(pdf_path, dpi=200)
-
-    for i, image in enumerate(images):
-        # 必要に応じて画像を縮小し、幅/高さを`max_dim`以下に収める
-        width, height = image.size
-        if width > max_dim or height > max_dim:
-            scale_factor = min(max_dim / width, max_dim / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            image = image.resize((new_width, new_height))
-        
-        image_path = os.path.join(output_dir, f"page_{i+1}.png")
-        image.save(image_path)
-        print(f"ページ{i+1}を {image_path} として保存しました（サイズ: {image.size}）")
-
-    print(f"{len(images)}ページをPNG画像に変換しました")
+    # pdftoppmはMediaBoxを描画するので、ページごとの長辺（pt）をそこから求める
+    page_sizes_pts = [
+        max(page.mediabox.width, page.mediabox.height) for page in PdfReader(pdf_path).pages
+    ]
+    num_pages = len(page_sizes_pts)
+    page_numbers = range(1, num_pages + 1)
+    image_paths = [os.path.join(output_dir, f"page_{p}.png") for p in page_numbers]
+
+    # ページごとのpdftoppmは別プロセスで、PILもリサイズとPNGエンコード中にGILを解放するので、スレッドで並列化できる
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        sizes = executor.map(
+            convert_page, [pdf_path] * num_pages, page_numbers, page_sizes_pts, image_paths, [max_dim] * num_pages
+        )
+        for page_number, image_path, size in zip(page_numbers, image_paths, sizes):
+            print(f"ページ{page_number}を {image_path} として保存しました（サイズ: {size}）")
+
+    print(f"{num_pages}ページをPNG画像に変換しました")
 
 
 if __name__ == "__main__":
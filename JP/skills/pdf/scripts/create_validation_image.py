@@ -1,6 +1,11 @@
 import json
 import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from PIL import Image, ImageDraw
 
 
@@ -10,24 +15,21 @@ from PIL import Image, ImageDraw
 
 def create_validation_image(page_number, fields_json_path, input_path, output_path):
     # 入力ファイルは、forms.mdで説明されている`fields.json`形式である必要があります。
+    # 画像処理の前にJSONファイルを閉じ、対象ページのボックスだけを一度で取り出しておく
     with open(fields_json_path, 'r') as f:
-        data = json.load(f)
-
-        img = Image.open(input_path)
-        draw = ImageDraw.Draw(img)
-        num_boxes = 0
-        
-        for field in data["form_fields"]:
-            if field["page_number"] == page_number:
-                entry_box = field['entry_bounding_box']
-                label_box = field['label_bounding_box']
-                # 入力欄バウンディングボックスに赤枠、ラベルに青枠を描画します。
-                draw.rectangle(entry_box, outline='red', width=2)
-                draw.rectangle(label_box, outline='blue', width=2)
-                num_boxes += 2
-        
-        img.save(output_path)
-        print(f"{output_path} に検証画像を作成しました（バウンディングボックス数: {num_boxes}）")
+        data = orjson.loads(f.read()) if orjson else json.load(f)
+    page_fields = [field for field in data["form_fields"] if field["page_number"] == page_number]
+
+    img = Image.open(input_path)
+    draw = ImageDraw.Draw(img)
+    # 入力欄バウンディングボックスに赤枠、ラベルに青枠を描画します。
+    for field in page_fields:
+        draw.rectangle(field['entry_bounding_box'], outline='red', width=2)
+        draw.rectangle(field['label_bounding_box'], outline='blue', width=2)
+    num_boxes = 2 * len(page_fields)
+
+    img.save(output_path)
+    print(f"{output_path} に検証画像を作成しました（バウンディングボックス数: {num_boxes}）")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
+from io import BytesIO
 import json
+from pathlib import Path
 import sys
 
 from pypdf import PdfReader
+from pypdf.generic import IndirectObject
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # PDF内の入力可能なフォームフィールドに関する情報を抽出し、
@@ -9,14 +17,23 @@ from pypdf import PdfReader
 
 
 # PdfReaderの`get_fields`および`update_page_form_field_values`が用いる形式に合わせています。
-def get_full_annotation_field_id(annotation):
-    components = []
-    while annotation:
-        field_name = annotation.get('/T')
-        if field_name:
-            components.append(field_name)
-        annotation = annotation.get('/Parent')
-    return ".".join(reversed(components)) if components else None
+# `parent_ids`を渡すと、親フィールドの完全修飾名を参照ごとに記録し、共有される`/Parent`チェーンを一度しか辿りません。
+def get_full_annotation_field_id(annotation, parent_ids=None):
+    parent = annotation.get('/Parent')
+    if parent is None:
+        prefix = None
+    elif parent_ids is not None and isinstance(parent, IndirectObject):
+        key = (parent.idnum, parent.generation)
+        if key not in parent_ids:
+            parent_ids[key] = get_full_annotation_field_id(parent.get_object(), parent_ids)
+        prefix = parent_ids[key]
+    else:
+        prefix = get_full_annotation_field_id(parent.get_object(), parent_ids)
+
+    field_name = annotation.get('/T')
+    if not field_name:
+        return prefix
+    return f"{prefix}.{field_name}" if prefix else field_name
 
 
 def make_field_dict(field, field_id):
@@ -80,21 +97,26 @@ def get_field_info(reader: PdfReader):
     # ただし全選択肢は同じフィールド名を共有します。
     # See https://westhealth.github.io/exploring-fillable-forms-with-pdfrw.html
     radio_fields_by_id = {}
+    parent_ids = {}
 
     for page_index, page in enumerate(reader.pages):
         annotations = page.get('/Annots', [])
         for ann in annotations:
-            field_id = get_full_annotation_field_id(ann)
+            # 間接参照の解決はアノテーションごとに一度だけ行う
+            ann = ann.get_object()
+            field_id = get_full_annotation_field_id(ann, parent_ids)
             if field_id in field_info_by_id:
                 field_info_by_id[field_id]["page"] = page_index + 1
                 field_info_by_id[field_id]["rect"] = ann.get('/Rect')
             elif field_id in possible_radio_names:
-                try:
-                    # ann['/AP']['/N'] should have two items. One of them is '/Off',
-                    # the other is the active value.
-                    on_values = [v for v in ann["/AP"]["/N"] if v != "/Off"]
-                except KeyError:
+                # ann['/AP']['/N'] should have two items. One of them is '/Off',
+                # the other is the active value.
+                # 例外処理を使わず、/APと/Nはそれぞれ一度だけ解決する
+                appearance = ann.get("/AP")
+                normal = appearance.get_object().get("/N") if appearance is not None else None
+                if normal is None:
                     continue
+                on_values = [v for v in normal.get_object() if v != "/Off"]
                 if len(on_values) == 1:
                     rect = ann.get("/Rect")
                     if field_id not in radio_fields_by_id:
@@ -136,10 +158,15 @@ def get_field_info(reader: PdfReader):
 
 
 def write_field_info(pdf_path: str, json_output_path: str):
-    reader = PdfReader(pdf_path)
+    # 小さなシーク読み込みを繰り返さないよう、PDF全体を一度でメモリへ読み込む
+    reader = PdfReader(BytesIO(Path(pdf_path).read_bytes()))
     field_info = get_field_info(reader)
-    with open(json_output_path, "w") as f:
-        json.dump(field_info, f, indent=2)
+    if orjson:
+        # pypdfのFloatObject（floatのサブクラス）はorjsonが直接扱えないためfloatに変換する
+        Path(json_output_path).write_bytes(orjson.dumps(field_info, default=float, option=orjson.OPT_INDENT_2))
+    else:
+        with open(json_output_path, "w") as f:
+            json.dump(field_info, f, indent=2)
     print(f"{len(field_info)}個のフィールドを {json_output_path} に書き出しました")
 
 
@@ -1,17 +1,37 @@
+from io import BytesIO
 import json
+import os
+from pathlib import Path
 import sys
 
 from pypdf import PdfReader, PdfWriter
 
 from extract_form_field_info import get_field_info
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # PDFの入力可能フォームフィールドに値を設定します。forms.mdを参照。
 
 
+# 同じテンプレートPDFに値を変えて繰り返し記入する場合に備え、検証用のフィールド情報を
+# (パス, 更新時刻, サイズ) をキーにキャッシュします（古いものから捨てます）。
+_FIELD_INFO_CACHE = {}
+_FIELD_INFO_CACHE_SIZE = 32
+
+# pypdfのwriterは細かいwrite()を大量に発行するため、出力ファイルのバッファを大きめに取る
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
 def fill_pdf_fields(input_pdf_path: str, fields_json_path: str, output_pdf_path: str):
-    with open(fields_json_path) as f:
-        fields = json.load(f)
+    if orjson:
+        fields = orjson.loads(Path(fields_json_path).read_bytes())
+    else:
+        with open(fields_json_path) as f:
+            fields = json.load(f)
     # ページ番号でグループ化します。
     fields_by_page = {}
     for field in fields:
@@ -22,11 +42,19 @@ def fill_pdf_fields(input_pdf_path: str, fields_json_path: str, output_pdf_path:
                 fields_by_page[page] = {}
             fields_by_page[page][field_id] = field["value"]
     
-    reader = PdfReader(input_pdf_path)
+    # 読み込み中にファイルが差し替えられても古い情報を使わないよう、キーは読み込み前に取る
+    stat = os.stat(input_pdf_path)
+    cache_key = (os.path.realpath(input_pdf_path), stat.st_mtime_ns, stat.st_size)
+    # 小さなシーク読み込みを繰り返さないよう、PDF全体を一度でメモリへ読み込む
+    reader = PdfReader(BytesIO(Path(input_pdf_path).read_bytes()))
 
     has_error = False
-    field_info = get_field_info(reader)
-    fields_by_ids = {f["field_id"]: f for f in field_info}
+    fields_by_ids = _FIELD_INFO_CACHE.get(cache_key)
+    if fields_by_ids is None:
+        if len(_FIELD_INFO_CACHE) >= _FIELD_INFO_CACHE_SIZE:
+            del _FIELD_INFO_CACHE[next(iter(_FIELD_INFO_CACHE))]
+        fields_by_ids = {f["field_id"]: f for f in get_field_info(reader)}
+        _FIELD_INFO_CACHE[cache_key] = fields_by_ids
     for field in fields:
         existing_field = fields_by_ids.get(field["field_id"])
         if not existing_field:
@@ -52,7 +80,7 @@ def fill_pdf_fields(input_pdf_path: str, fields_json_path: str, output_pdf_path:
     # ただし、ユーザーが何も変更していなくても「変更を保存しますか？」のダイアログが出る場合があります。
     writer.set_need_appearances_writer(True)
     
-    with open(output_pdf_path, "wb") as f:
+    with open(output_pdf_path, "wb", buffering=_WRITE_BUFFER_SIZE) as f:
         writer.write(f)
 
 
@@ -94,9 +122,12 @@ def monkeypatch_pydpf_method():
 
     def patched_get_inherited(self, key: str, default = None):
         result = original_get_inherited(self, key, default)
-        if key == FieldDictionaryAttributes.Opt:
-            if isinstance(result, list) and all(isinstance(v, list) and len(v) == 2 for v in result):
-                result = [r[0] for r in result]
+        if key != FieldDictionaryAttributes.Opt:
+            return result
+        # 全要素を調べず、先頭要素が2要素リストかどうかで判定する
+        # （各要素は変換時に個別に確認するので、文字列が混在していてもそのまま残る）
+        if isinstance(result, list) and result and isinstance(result[0], list) and len(result[0]) == 2:
+            return [r[0] if isinstance(r, list) else r for r in result]
         return result
 
     DictionaryObject.get_inherited = patched_get_inherited
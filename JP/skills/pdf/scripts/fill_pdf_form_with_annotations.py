@@ -1,20 +1,32 @@
+from io import BytesIO
 import json
+from pathlib import Path
 import sys
 
 from pypdf import PdfReader, PdfWriter
 from pypdf.annotations import FreeText
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # `fields.json`で定義されたテキスト注釈を追加してPDFに記入します。forms.mdを参照。
 
+# pypdfのwriterは細かいwrite()を大量に発行するため、出力ファイルのバッファを大きめに取る
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def page_transform(image_width, image_height, pdf_width, pdf_height):
+    """画像座標からPDF座標への変換係数 (x_scale, y_scale, pdf_height) を返す"""
+    return pdf_width / image_width, pdf_height / image_height, pdf_height
+
 
-def transform_coordinates(bbox, image_width, image_height, pdf_width, pdf_height):
+def transform_coordinates(bbox, x_scale, y_scale, pdf_height):
     """バウンディングボックスを画像座標からPDF座標へ変換する"""
     # 画像座標: 原点は左上、yは下方向に増加
     # PDF座標: 原点は左下、yは上方向に増加
-    x_scale = pdf_width / image_width
-    y_scale = pdf_height / image_height
-    
     left = bbox[0] * x_scale
     right = bbox[2] * x_scale
     
@@ -29,39 +41,27 @@ def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path):
     """fields.jsonのデータでPDFフォームを記入する"""
     
     # 入力の`fields.json`はforms.mdで説明されている形式です。
-    with open(fields_json_path, "r") as f:
-        fields_data = json.load(f)
+    if orjson:
+        fields_data = orjson.loads(Path(fields_json_path).read_bytes())
+    else:
+        with open(fields_json_path, "r") as f:
+            fields_data = json.load(f)
     
     # PDFを開く
-    reader = PdfReader(input_pdf_path)
-    writer = PdfWriter()
-    
-    # 全ページをwriterへコピー
-    writer.append(reader)
+    # 小さなシーク読み込みを繰り返さないよう、PDF全体を一度でメモリへ読み込む
+    reader = PdfReader(BytesIO(Path(input_pdf_path).read_bytes()))
+    # 全ページをwriterへコピー（clone_fromはappendと違い、ページごとのマージ処理を通らない）
+    writer = PdfWriter(clone_from=reader)
     
-    # ページごとのPDF寸法を取得
-    pdf_dimensions = {}
-    for i, page in enumerate(reader.pages):
-        mediabox = page.mediabox
-        pdf_dimensions[i + 1] = [mediabox.width, mediabox.height]
+    # ページ番号→画像寸法の対応表と、ページごとの変換係数（そのページで最初に使うときに1回だけ計算）
+    pages_by_num = {p["page_number"]: p for p in fields_data["pages"]}
+    page_transforms = {}
     
     # 各フォームフィールドを処理
     annotations = []
     for field in fields_data["form_fields"]:
         page_num = field["page_number"]
         
-        # ページ寸法を取得し、座標を変換
-        page_info = next(p for p in fields_data["pages"] if p["page_number"] == page_num)
-        image_width = page_info["image_width"]
-        image_height = page_info["image_height"]
-        pdf_width, pdf_height = pdf_dimensions[page_num]
-        
-        transformed_entry_box = transform_coordinates(
-            field["entry_bounding_box"],
-            image_width, image_height,
-            pdf_width, pdf_height
-        )
-        
         # 空フィールドはスキップ
         if "entry_text" not in field or "text" not in field["entry_text"]:
             continue
@@ -70,6 +70,18 @@ def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path):
         if not text:
             continue
         
+        # ページ寸法を取得し、座標を変換
+        if page_num not in page_transforms:
+            page_info = pages_by_num[page_num]
+            mediabox = reader.pages[page_num - 1].mediabox
+            page_transforms[page_num] = page_transform(
+                page_info["image_width"], page_info["image_height"],
+                mediabox.width, mediabox.height
+            )
+        transformed_entry_box = transform_coordinates(
+            field["entry_bounding_box"], *page_transforms[page_num]
+        )
+        
         font_name = entry_text.get("font", "Arial")
         font_size = str(entry_text.get("font_size", 14)) + "pt"
         font_color = entry_text.get("font_color", "000000")
@@ -90,7 +102,7 @@ def fill_pdf_form(input_pdf_path, fields_json_path, output_pdf_path):
         writer.add_annotation(page_number=page_num - 1, annotation=annotation)
         
     # 記入済みPDFを保存
-    with open(output_pdf_path, "wb") as output:
+    with open(output_pdf_path, "wb", buffering=_WRITE_BUFFER_SIZE) as output:
         writer.write(output)
     
     print(f"PDFフォームへの記入が完了し、{output_pdf_path} に保存しました")